@@ -1,6 +1,7 @@
 from collections.abc import Generator
 from typing import Annotated
 
+import httpx
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -11,6 +12,7 @@ from sqlmodel import Session
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
+from app.core.ml_client import ml_client
 from app.models import User
 from app.schemas import TokenPayload
 
@@ -24,7 +26,12 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+def get_ml_client() -> httpx.AsyncClient:
+    return ml_client.client
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+MLClientDep = Annotated[httpx.AsyncClient, Depends(get_ml_client)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
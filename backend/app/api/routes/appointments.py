@@ -1,11 +1,12 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from fastapi.params import Query
 from sqlmodel import func, or_, select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.appointment_scoring import appointment_scorer
 from app.models import Appointment
 from app.schemas import (
     AppointmentCreateDoctor,
@@ -123,12 +124,14 @@ def create_appointment_patient(
     session: SessionDep,
     current_user: CurrentUser,
     appointment_in: AppointmentCreatePatient,
+    background_tasks: BackgroundTasks,
 ) -> Any:
     """
     Пациент создаёт приём:
     - задаёт жалобы
     - может опционально указать doctor_id
     - статус ставится в 'В ожидании'
+    - NLP-диагноз и рекомендации заполняются в фоне
     """
     if current_user.role != "patient" and not current_user.is_superuser:
         raise HTTPException(
@@ -144,6 +147,7 @@ def create_appointment_patient(
     session.add(appointment)
     session.commit()
     session.refresh(appointment)
+    background_tasks.add_task(appointment_scorer.notify)
     return appointment
 
 
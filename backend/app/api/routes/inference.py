@@ -1,10 +1,19 @@
-import logging
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
 
 import httpx
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
+from app.api.deps import MLClientDep, SessionDep
 from app.core.config import settings
-from app.schemas import InferenceRequest, InferenceResponse
+from app.core.inference_cache import inference_cache
+from app.core.inference_jobs import inference_jobs
+from app.models import InferenceJob
+from app.schemas import InferenceJobPublic, InferenceRequest, InferenceResponse
+from app.utils import build_inference_prompt
 
 router = APIRouter(prefix="/inference", tags=["inference"])
 
@@ -13,31 +22,43 @@ router = APIRouter(prefix="/inference", tags=["inference"])
     "/run",
     response_model=InferenceResponse,
 )
-async def run_inference(payload: InferenceRequest) -> InferenceResponse:
+async def run_inference(
+    payload: InferenceRequest,
+    client: MLClientDep,
+    session: SessionDep,
+    fresh: bool = False,
+) -> InferenceResponse:
     """
     Принимает текст (жалобы, историю болезни и т.п.),
     пересылает его в ML‑микросервис и возвращает результат.
-    """
-    ml_url = settings.ML_HOST + "/api/v1/model/predict"
-
-    logging.info(ml_url)
 
-    patient_gender = "Мужчина" if payload.gender == "male" else "Женщина"
+    Повторные запросы с тем же текстом отвечаются из кэша; `fresh=true`
+    запрашивает новое предсказание у ML‑микросервиса.
+    """
+    prompt = build_inference_prompt(payload.gender, payload.age, payload.complaints)
 
-    prompt = f"{patient_gender}, {payload.age} лет, {payload.complaints}"
+    use_cache = settings.INFERENCE_CACHE_ENABLED
+    if use_cache and not fresh:
+        cached = await run_in_threadpool(inference_cache.get, session, prompt)
+        if cached is not None:
+            return cached
 
     try:
-        async with httpx.AsyncClient(timeout=40.0) as client:
-            resp = await client.post(
-                ml_url,
-                params={"text": prompt},
-            )
+        resp = await client.post(
+            "/api/v1/model/predict",
+            params={"text": prompt},
+        )
         resp.raise_for_status()
     except httpx.HTTPStatusError as exc:
         raise HTTPException(
             status_code=400,
             detail=f"ML service error: {exc.response.text}",
         )
+    except httpx.PoolTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent requests to ML service, retry later",
+        )
     except httpx.RequestError as exc:
         raise HTTPException(
             status_code=400,
@@ -45,4 +66,61 @@ async def run_inference(payload: InferenceRequest) -> InferenceResponse:
         )
 
     data = resp.json()
-    return InferenceResponse(**data)
+    response = InferenceResponse(**data)
+    if use_cache:
+        await run_in_threadpool(
+            inference_cache.put, session, prompt, data["model_version"], response
+        )
+    return response
+
+
+@router.post(
+    "/jobs",
+    response_model=InferenceJobPublic,
+    status_code=202,
+)
+async def create_inference_job(
+    payload: InferenceRequest, session: SessionDep
+) -> InferenceJob:
+    """
+    Ставит запрос на инференс в очередь и сразу возвращает задачу.
+
+    Результат можно получить через `GET /inference/jobs/{job_id}`
+    или подписавшись на `GET /inference/jobs/{job_id}/events`.
+    """
+    prompt = build_inference_prompt(payload.gender, payload.age, payload.complaints)
+    return await inference_jobs.enqueue(session, prompt)
+
+
+@router.get("/jobs/{job_id}", response_model=InferenceJobPublic)
+def read_inference_job(job_id: uuid.UUID, session: SessionDep) -> InferenceJob:
+    """
+    Возвращает состояние задачи инференса и, когда она готова, результат.
+    """
+    job = session.get(InferenceJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Inference job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events", response_class=StreamingResponse)
+async def inference_job_events(job_id: uuid.UUID) -> StreamingResponse:
+    """
+    Server-sent events: событие с задачей при каждом изменении её статуса.
+
+    Поток закрывается после события `done` или `failed`.
+    """
+    if await asyncio.to_thread(inference_jobs.load, job_id) is None:
+        raise HTTPException(status_code=404, detail="Inference job not found")
+
+    async def events() -> AsyncIterator[str]:
+        async for job in inference_jobs.watch(job_id):
+            data = InferenceJobPublic.model_validate(job).model_dump_json()
+            yield f"event: {job.status.value}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
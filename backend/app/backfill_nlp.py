@@ -0,0 +1,180 @@
+"""Score historical appointments that have no NLP diagnosis.
+
+Usage: python -m app.backfill_nlp [--batch-size 500] [--concurrency 4]
+
+Appointments with complaints but an empty `nlp_diagnosis` are read in primary
+key order through a server-side cursor, sent to ml-service's
+`/predict/batch` endpoint and written back with one executemany UPDATE per
+batch. Up to `--concurrency` batches are scored at the same time.
+
+After every batch, in order, the last appointment id is saved to the
+checkpoint file, so an interrupted run continues where it stopped. Rows
+that get an NLP diagnosis in the meantime are left untouched, and rows
+ml-service rejects are logged and skipped.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import Executable, Row, select
+from sqlmodel import col
+
+from app.core.appointment_scoring import (
+    build_prompt,
+    has_complaints,
+    missing_diagnosis,
+    result_params,
+    update_statement,
+)
+from app.core.db import engine
+from app.core.ml_client import create_client, predict_each
+from app.models import Appointment, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def pending_appointments(after: uuid.UUID | None) -> Executable:
+    statement = (
+        select(
+            col(Appointment.id),
+            col(Appointment.complaints),
+            col(Appointment.created_at),
+            col(User.gender),
+            col(User.birth_date),
+        )
+        .join(User, col(Appointment.patient_id) == User.id, isouter=True)
+        .where(missing_diagnosis)
+        .where(has_complaints)
+        .order_by(col(Appointment.id))
+    )
+    if after is not None:
+        statement = statement.where(col(Appointment.id) > after)
+    return statement
+
+
+def load_checkpoint(path: Path) -> uuid.UUID | None:
+    if not path.exists():
+        return None
+    return uuid.UUID(json.loads(path.read_text())["last_id"])
+
+
+def save_checkpoint(path: Path, last_id: uuid.UUID) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps({"last_id": str(last_id)}))
+    os.replace(tmp_path, path)
+
+
+def write_results(rows: Sequence[Row[Any]], results: list[Any]) -> None:
+    with engine.begin() as connection:
+        connection.execute(update_statement, result_params(rows, results))
+
+
+async def score_batch(client: httpx.AsyncClient, rows: Sequence[Row[Any]]) -> None:
+    prompts = {row.id: build_prompt(row) for row in rows}
+    scorable = [row for row in rows if prompts[row.id]]
+    if not scorable:
+        return
+    results = await predict_each(
+        client, [prompts[row.id] for row in scorable], attempts=8, max_wait=30
+    )
+    scored = []
+    for row, result in zip(scorable, results, strict=True):
+        if result is None:
+            logger.warning(f"ML service rejected appointment {row.id}, skipping it")
+        else:
+            scored.append((row, result))
+    if scored:
+        await asyncio.to_thread(
+            write_results,
+            [row for row, _ in scored],
+            [result for _, result in scored],
+        )
+
+
+async def backfill(
+    checkpoint: Path, batch_size: int, concurrency: int, limit: int | None
+) -> None:
+    after = load_checkpoint(checkpoint)
+    if after is not None:
+        logger.info(f"Resuming after appointment {after}")
+
+    processed = scheduled = 0
+    started_at = reported_at = time.perf_counter()
+    # Batches are large and slow: no hedging, and a longer read timeout
+    async with create_client(hedge=False, read_timeout=120.0) as client:
+        # stream_results keeps a server-side cursor open on its own connection
+        with engine.connect().execution_options(
+            stream_results=True, yield_per=batch_size
+        ) as connection:
+            result = connection.execute(pending_appointments(after))
+            batches = result.partitions()
+            in_flight: deque[tuple[uuid.UUID, int, asyncio.Task[None]]] = deque()
+
+            async def finish_oldest() -> None:
+                nonlocal processed, reported_at
+                last_id, count, task = in_flight.popleft()
+                await task
+                save_checkpoint(checkpoint, last_id)
+                processed += count
+                if time.perf_counter() - reported_at >= 10:
+                    reported_at = time.perf_counter()
+                    rate = processed / (reported_at - started_at)
+                    logger.info(f"{processed} rows scored, {rate:.1f} rows/sec")
+
+            try:
+                while limit is None or scheduled < limit:
+                    rows = await asyncio.to_thread(next, batches, None)
+                    if not rows:
+                        break
+                    scheduled += len(rows)
+                    task = asyncio.create_task(score_batch(client, rows))
+                    in_flight.append((rows[-1].id, len(rows), task))
+                    if len(in_flight) >= concurrency:
+                        await finish_oldest()
+                while in_flight:
+                    await finish_oldest()
+            finally:
+                for _, _, task in in_flight:
+                    task.cancel()
+
+    elapsed = time.perf_counter() - started_at
+    rate = processed / elapsed if elapsed else 0.0
+    logger.info(
+        f"Backfill finished: {processed} rows in {elapsed:.1f}s, {rate:.1f} rows/sec"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="stop after about this many rows")
+    parser.add_argument(
+        "--checkpoint", type=Path, default=Path("backfill_nlp.checkpoint.json")
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore an existing checkpoint"
+    )
+    args = parser.parse_args()
+
+    if args.restart:
+        args.checkpoint.unlink(missing_ok=True)
+    logger.info("Backfilling NLP diagnoses")
+    asyncio.run(
+        backfill(args.checkpoint, args.batch_size, args.concurrency, args.limit)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+from sqlalchemy import Row, bindparam, select, update
+from sqlmodel import col, or_
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.ml_client import ml_client, predict_each
+from app.models import Appointment, AppointmentStatus, User
+from app.utils import age_on, build_inference_prompt
+
+logger = logging.getLogger(__name__)
+
+missing_diagnosis = or_(
+    col(Appointment.nlp_diagnosis).is_(None), col(Appointment.nlp_diagnosis) == ""
+)
+# Postgres trim() only strips spaces, so look for any non-whitespace character
+has_complaints = col(Appointment.complaints).regexp_match(r"\S")
+
+# Rows that get an NLP diagnosis in the meantime are left untouched
+update_statement = (
+    update(Appointment)
+    .where(col(Appointment.id) == bindparam("appointment_id"))
+    .where(missing_diagnosis)
+    .values(
+        nlp_diagnosis=bindparam("diagnosis"),
+        nlp_recommendations=bindparam("recommendations"),
+        nlp_retry_at=None,
+        updated_at=bindparam("updated_at"),
+    )
+)
+
+retry_statement = (
+    update(Appointment)
+    .where(col(Appointment.id) == bindparam("appointment_id"))
+    .values(nlp_retry_at=bindparam("retry_at"))
+)
+
+
+def build_prompt(row: Row[Any]) -> str:
+    age = None
+    if row.birth_date is not None:
+        age = age_on(row.birth_date, row.created_at.date())
+    return build_inference_prompt(row.gender, age, row.complaints.strip())
+
+
+def result_params(rows: Sequence[Row[Any]], results: list[Any]) -> list[dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "appointment_id": row.id,
+            "diagnosis": result["diagnosis"],
+            "recommendations": result["recommendations"],
+            "updated_at": now,
+        }
+        for row, result in zip(rows, results, strict=True)
+    ]
+
+
+class AppointmentScorer:
+    """Fills in the NLP diagnosis of new pending appointments in the background
+
+    Creating an appointment wakes the scorer in that process; appointments
+    created through other processes are found by polling. Each round claims
+    up to `batch_size` pending appointments in a short transaction: rows are
+    picked with FOR UPDATE SKIP LOCKED, so processes never claim the same
+    ones, and leased for `lease_seconds` by moving their retry time forward.
+    The ml-service request runs after the claim is committed, with no locks
+    held, and the results are written in a second transaction.
+
+    A failed round pushes the retry time of its appointments back by
+    `backoff_seconds`, doubled after every further failure. Appointments
+    are given up after `max_attempts` claims and keep no NLP diagnosis.
+    Appointments whose prompt ml-service rejects with a 4xx are given up at
+    once, without failing the rest of their round.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int,
+        lease_seconds: float,
+        backoff_seconds: float,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+        self.backoff = timedelta(seconds=backoff_seconds)
+        self._task: asyncio.Task[None] | None = None
+        self._wake = asyncio.Event()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._work())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def notify(self) -> None:
+        self._wake.set()
+
+    async def score_pending(self) -> int:
+        """Score one batch of pending appointments and return its size"""
+        claimed = await asyncio.to_thread(self._claim)
+        if not claimed:
+            return 0
+        prompts = {row.id: build_prompt(row) for row in claimed}
+        rows = [row for row in claimed if prompts[row.id]]
+        rejected = [row for row in claimed if not prompts[row.id]]
+        results: list[Any] = []
+        if rows:
+            try:
+                results = await predict_each(
+                    ml_client.client,
+                    [prompts[row.id] for row in rows],
+                    attempts=3,
+                    max_wait=10,
+                )
+            except Exception:
+                await asyncio.to_thread(self._release, rows)
+                await asyncio.to_thread(self._give_up, rejected)
+                raise
+
+        answered = list(zip(rows, results, strict=True))
+        scored = [(row, result) for row, result in answered if result is not None]
+        rejected += [row for row, result in answered if result is None]
+        await asyncio.to_thread(
+            self._complete,
+            [row for row, _ in scored],
+            [result for _, result in scored],
+        )
+        await asyncio.to_thread(self._give_up, rejected)
+        return len(claimed)
+
+    def _claim(self) -> Sequence[Row[Any]]:
+        now = datetime.now(timezone.utc)
+        claimable = (
+            select(col(Appointment.id))
+            .where(col(Appointment.status) == AppointmentStatus.pending)
+            .where(missing_diagnosis)
+            .where(has_complaints)
+            .where(
+                or_(
+                    col(Appointment.nlp_retry_at).is_(None),
+                    col(Appointment.nlp_retry_at) <= now,
+                )
+            )
+            .where(col(Appointment.nlp_attempts) < self.max_attempts)
+            .order_by(col(Appointment.updated_at))
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (
+            update(Appointment)
+            .where(col(Appointment.id).in_(claimable.scalar_subquery()))
+            .values(
+                nlp_attempts=col(Appointment.nlp_attempts) + 1,
+                nlp_retry_at=now + self.lease,
+            )
+            .returning(
+                col(Appointment.id),
+                col(Appointment.complaints),
+                col(Appointment.created_at),
+                col(Appointment.patient_id),
+                col(Appointment.nlp_attempts),
+            )
+            .cte("claimed")
+        )
+        statement = select(
+            claimed.c.id,
+            claimed.c.complaints,
+            claimed.c.created_at,
+            claimed.c.nlp_attempts,
+            col(User.gender),
+            col(User.birth_date),
+        ).join_from(claimed, User, claimed.c.patient_id == User.id, isouter=True)
+        with engine.begin() as connection:
+            return connection.execute(statement).all()
+
+    def _complete(self, rows: Sequence[Row[Any]], results: list[Any]) -> None:
+        if not rows:
+            return
+        with engine.begin() as connection:
+            connection.execute(update_statement, result_params(rows, results))
+
+    def _release(self, rows: Sequence[Row[Any]]) -> None:
+        if not rows:
+            return
+        now = datetime.now(timezone.utc)
+        params = [
+            {
+                "appointment_id": row.id,
+                "retry_at": now + self.backoff * 2 ** (row.nlp_attempts - 1),
+            }
+            for row in rows
+        ]
+        with engine.begin() as connection:
+            connection.execute(retry_statement, params)
+        exhausted = sum(row.nlp_attempts >= self.max_attempts for row in rows)
+        if exhausted:
+            logger.warning(
+                f"Gave up scoring {exhausted} appointments after "
+                f"{self.max_attempts} attempts"
+            )
+
+    def _give_up(self, rows: Sequence[Row[Any]]) -> None:
+        """Stop claiming appointments whose prompt ml-service cannot score"""
+        if not rows:
+            return
+        with engine.begin() as connection:
+            connection.execute(
+                update(Appointment)
+                .where(col(Appointment.id).in_([row.id for row in rows]))
+                .values(nlp_attempts=self.max_attempts, nlp_retry_at=None)
+            )
+        logger.warning(f"Gave up scoring {len(rows)} appointments rejected by ML")
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                scored = await self.score_pending()
+            except httpx.HTTPError as e:
+                logger.warning(f"Appointment scoring failed: {str(e)}")
+                scored = 0
+            except Exception as e:
+                logger.error(f"Appointment scoring failed: {str(e)}")
+                scored = 0
+            if scored:
+                logger.info(f"Scored {scored} new appointments")
+            if scored == self.batch_size:
+                # More appointments may be waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+appointment_scorer = AppointmentScorer(
+    batch_size=settings.APPOINTMENT_SCORING_BATCH_SIZE,
+    poll_seconds=settings.APPOINTMENT_SCORING_POLL_SECONDS,
+    max_attempts=settings.APPOINTMENT_SCORING_MAX_ATTEMPTS,
+    lease_seconds=settings.APPOINTMENT_SCORING_LEASE_SECONDS,
+    backoff_seconds=settings.APPOINTMENT_SCORING_BACKOFF_SECONDS,
+)
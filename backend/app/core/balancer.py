@@ -0,0 +1,237 @@
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from enum import Enum as PyEnum
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+REPLICA_OUTSTANDING = Gauge(
+    "ml_client_replica_outstanding",
+    "Requests in progress per ml-service replica",
+    ["replica"],
+)
+REPLICA_EJECTED = Gauge(
+    "ml_client_replica_ejected",
+    "1 while the circuit breaker keeps the replica out of rotation",
+    ["replica"],
+)
+HEDGED_REQUESTS = Counter(
+    "ml_client_hedged_requests",
+    "Requests repeated on a second replica, by the attempt that answered first",
+    ["winner"],
+)
+
+
+class BreakerState(str, PyEnum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class Replica:
+    """One ml-service replica with its circuit breaker"""
+
+    def __init__(self, url: str, failure_threshold: int, reset_seconds: float):
+        self.url = httpx.URL(url)
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.outstanding = 0
+        self.failures = 0
+        self.state = BreakerState.closed
+        self.opened_at = 0.0
+        self.probing = False
+        self.outstanding_gauge = REPLICA_OUTSTANDING.labels(replica=url)
+        self.ejected_gauge = REPLICA_EJECTED.labels(replica=url)
+
+    def available(self, now: float) -> bool:
+        if (
+            self.state is BreakerState.open
+            and now - self.opened_at >= self.reset_seconds
+        ):
+            self.state = BreakerState.half_open
+        if self.state is BreakerState.half_open:
+            # Only one probe at a time decides whether the replica is back
+            return not self.probing
+        return self.state is BreakerState.closed
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        self.state = BreakerState.closed
+        self.ejected_gauge.set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if (
+            self.state is BreakerState.half_open
+            or self.failures >= self.failure_threshold
+        ):
+            self.state = BreakerState.open
+            self.opened_at = time.monotonic()
+            self.ejected_gauge.set(1)
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful requests to one endpoint"""
+
+    def __init__(self, size: int = 256, min_samples: int = 20):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BalancedTransport(httpx.AsyncBaseTransport):
+    """Spreads requests over ml-service replicas
+
+    Each request goes to the available replica with the fewest outstanding
+    requests. Connection errors, timeouts and 5xx responses count as
+    failures; a request whose connection is refused moves to another
+    replica. With `hedge`, a request still running after the p95 latency of
+    its endpoint is repeated on another replica and the first good response
+    wins. ml-service inference has no side effects, so repeating is safe.
+
+    Responses are read in full before they are returned, so the body is
+    available after the replica's request slot has been released.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncHTTPTransport,
+        urls: list[str],
+        failure_threshold: int,
+        reset_seconds: float,
+        hedge: bool = False,
+    ):
+        self.transport = transport
+        self.replicas = [Replica(url, failure_threshold, reset_seconds) for url in urls]
+        self.hedge = hedge
+        self.latencies: defaultdict[str, LatencyWindow] = defaultdict(LatencyWindow)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests in progress over all replicas, hedged copies included"""
+        return sum(replica.outstanding for replica in self.replicas)
+
+    def pick(self, exclude: Replica | None = None) -> Replica | None:
+        now = time.monotonic()
+        candidates = [
+            replica
+            for replica in self.replicas
+            if replica is not exclude and replica.available(now)
+        ]
+        if not candidates:
+            return None
+        # Random tie-breaking keeps idle replicas from all going to the first
+        replica = min(candidates, key=lambda r: (r.outstanding, random.random()))
+        if replica.state is BreakerState.half_open:
+            replica.probing = True
+        return replica
+
+    def route(self, request: httpx.Request, replica: Replica) -> httpx.Request:
+        url = request.url.copy_with(
+            scheme=replica.url.scheme,
+            host=replica.url.host,
+            port=replica.url.port,
+            path=replica.url.path.rstrip("/") + request.url.path,
+        )
+        headers = request.headers.copy()
+        headers["Host"] = url.netloc.decode("ascii")
+        return httpx.Request(
+            request.method,
+            url,
+            headers=headers,
+            content=request.content,
+            extensions=request.extensions,
+        )
+
+    async def send(self, replica: Replica, request: httpx.Request) -> httpx.Response:
+        replica.outstanding += 1
+        replica.outstanding_gauge.inc()
+        started_at = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(
+                self.route(request, replica)
+            )
+            await response.aread()
+        except httpx.PoolTimeout:
+            # The connection pool is shared, so this says nothing about the replica
+            replica.probing = False
+            raise
+        except httpx.TransportError:
+            replica.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # The other attempt of a hedged request answered first
+            replica.probing = False
+            raise
+        finally:
+            replica.outstanding -= 1
+            replica.outstanding_gauge.dec()
+
+        if response.status_code >= 500:
+            replica.record_failure()
+        else:
+            replica.record_success()
+            self.latencies[request.url.path].add(time.perf_counter() - started_at)
+        return response
+
+    async def attempt(self, replica: Replica, request: httpx.Request) -> httpx.Response:
+        try:
+            return await self.send(replica, request)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # The request never reached the replica, so another one can take it
+            other = self.pick(exclude=replica)
+            if other is None:
+                raise
+            return await self.send(other, request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        replica = self.pick()
+        if replica is None:
+            raise httpx.ConnectError(
+                "All ml-service replicas are out of rotation", request=request
+            )
+
+        delay = None
+        if self.hedge and len(self.replicas) > 1:
+            delay = self.latencies[request.url.path].percentile(0.95)
+        if delay is None:
+            return await self.attempt(replica, request)
+
+        first = asyncio.create_task(self.attempt(replica, request))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        backup = None if done else self.pick(exclude=replica)
+        if backup is None:
+            return await first
+
+        second = asyncio.create_task(self.attempt(backup, request))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        winner = "first" if task is first else "hedge"
+                        HEDGED_REQUESTS.labels(winner=winner).inc()
+                        return task.result()
+            HEDGED_REQUESTS.labels(winner="none").inc()
+            return await first
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -35,7 +35,64 @@ class Settings(BaseSettings):
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     FRONTEND_HOST: str = "http://localhost:5173"
-    ML_HOST: str = "http://localhost:8008"
+    # One URL or a comma-separated list of ml-service replicas
+    ML_HOST: Annotated[list[AnyUrl] | str, BeforeValidator(parse_cors)] = (
+        "http://localhost:8008"
+    )
+    # One keep-alive connection pool to ml-service is shared by all requests
+    ML_MAX_CONNECTIONS: int = 100
+    ML_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ML_KEEPALIVE_EXPIRY: float = 30.0
+    ML_HTTP2: bool = False
+    ML_CONNECT_TIMEOUT: float = 5.0
+    ML_READ_TIMEOUT: float = 40.0
+    ML_WRITE_TIMEOUT: float = 10.0
+    # Time to wait for a free connection when all ML_MAX_CONNECTIONS are busy
+    ML_POOL_TIMEOUT: float = 5.0
+    # A replica is ejected after this many consecutive failures, and after
+    # ML_BREAKER_RESET_SECONDS a single probe request decides if it returns
+    ML_BREAKER_FAILURES: int = 5
+    ML_BREAKER_RESET_SECONDS: float = 30.0
+    # Repeat a request on another replica once it is slower than the p95
+    # latency of recent requests to the same endpoint
+    ML_HEDGE_ENABLED: bool = False
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def ml_hosts(self) -> list[str]:
+        return [str(host).rstrip("/") for host in parse_cors(self.ML_HOST)]
+
+    # Inference results by prompt and model version, in Postgres with a small
+    # per-process LRU in front
+    INFERENCE_CACHE_ENABLED: bool = True
+    INFERENCE_CACHE_LRU_SIZE: int = 1000
+    INFERENCE_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7
+    INFERENCE_CACHE_MAX_ROWS: int = 100_000
+    INFERENCE_CACHE_PRUNE_SECONDS: float = 600.0
+
+    # Asynchronous inference jobs, queued in Postgres and scored in batches by
+    # INFERENCE_JOB_WORKERS tasks in every backend process
+    INFERENCE_JOB_WORKERS: int = 2
+    INFERENCE_JOB_BATCH_SIZE: int = 32
+    INFERENCE_JOB_POLL_SECONDS: float = 0.5
+    INFERENCE_JOB_MAX_ATTEMPTS: int = 3
+    # A running job whose worker died is picked up again after this long
+    INFERENCE_JOB_LEASE_SECONDS: float = 120.0
+    # Finished jobs are deleted after this long
+    INFERENCE_JOB_TTL_SECONDS: int = 60 * 60
+
+    # New pending appointments get their NLP diagnosis in the background,
+    # APPOINTMENT_SCORING_BATCH_SIZE at a time
+    APPOINTMENT_SCORING_ENABLED: bool = True
+    APPOINTMENT_SCORING_BATCH_SIZE: int = 32
+    APPOINTMENT_SCORING_POLL_SECONDS: float = 5.0
+    APPOINTMENT_SCORING_MAX_ATTEMPTS: int = 5
+    # A claimed appointment whose round did not finish is claimed again after this long
+    APPOINTMENT_SCORING_LEASE_SECONDS: float = 120.0
+    # A failed appointment waits this long before its next attempt, doubled
+    # after every further failure
+    APPOINTMENT_SCORING_BACKOFF_SECONDS: float = 30.0
+
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
     BACKEND_CORS_ORIGINS: Annotated[
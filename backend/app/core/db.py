@@ -1,3 +1,4 @@
+from sqlalchemy import text
 from sqlmodel import Session, create_engine, select
 
 from app import crud
@@ -7,6 +8,15 @@ from app.schemas import UserCreate
 
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
+# create_all only creates missing tables, so columns added to existing tables
+# are added here; every statement must be safe to run again
+SCHEMA_UPGRADES = [
+    "ALTER TABLE appointments"
+    " ADD COLUMN IF NOT EXISTS nlp_attempts integer NOT NULL DEFAULT 0",
+    "ALTER TABLE appointments"
+    " ADD COLUMN IF NOT EXISTS nlp_retry_at timestamp with time zone",
+]
+
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
 # otherwise, SQLModel might fail to initialize relationships properly
@@ -21,6 +31,9 @@ def init_db(session: Session) -> None:
 
     # This works because the models are already imported and registered from app.models
     SQLModel.metadata.create_all(engine)
+    for statement in SCHEMA_UPGRADES:
+        session.execute(text(statement))
+    session.commit()
 
     # Create superuser if not exists
     superuser = session.exec(
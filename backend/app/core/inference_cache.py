@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models import InferenceCacheEntry
+from app.schemas import InferenceResponse
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+class InferenceCache:
+    """Inference results keyed by prompt hash and ml-service model version
+
+    Rows are shared by all backend processes; a bounded LRU in each process
+    answers repeated prompts without a query. Lookups use the model version
+    ml-service reported last, so after a model swap the first response with
+    the new version switches the cache over and old rows are no longer read.
+    The reported version includes ml-service's runtime fingerprint, so a
+    change of backend, precision or truncation switches it over as well.
+    Database errors are logged and treated as misses.
+    """
+
+    def __init__(self, lru_size: int, ttl_seconds: int, max_rows: int) -> None:
+        self.lru_size = lru_size
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_rows = max_rows
+        self.model_version: str | None = None
+        self._lru: OrderedDict[str, tuple[datetime, InferenceResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, prompt: str) -> InferenceResponse | None:
+        key = prompt_hash(prompt)
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if entry[0] >= self._cutoff():
+                    self._lru.move_to_end(key)
+                    return entry[1]
+                del self._lru[key]
+
+        try:
+            version = self.model_version or self._latest_version(session)
+            if version is None:
+                return None
+            row = session.exec(
+                select(InferenceCacheEntry)
+                .where(col(InferenceCacheEntry.prompt_hash) == key)
+                .where(col(InferenceCacheEntry.model_version) == version)
+                .where(col(InferenceCacheEntry.created_at) >= self._cutoff())
+            ).first()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.warning(f"Inference cache lookup failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+
+        response = InferenceResponse(
+            diagnosis=row.diagnosis, recommendations=row.recommendations
+        )
+        self._remember(key, version, row.created_at, response)
+        return response
+
+    def put(
+        self,
+        session: Session,
+        prompt: str,
+        model_version: str,
+        response: InferenceResponse,
+    ) -> None:
+        key = prompt_hash(prompt)
+        now = datetime.now(timezone.utc)
+        values = {
+            "prompt_hash": key,
+            "model_version": model_version,
+            "diagnosis": response.diagnosis,
+            "recommendations": response.recommendations,
+            "created_at": now,
+        }
+        statement = insert(InferenceCacheEntry).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["prompt_hash", "model_version"], set_=values
+        )
+        try:
+            session.execute(statement)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.warning(f"Inference cache write failed: {str(e)}")
+        self._remember(key, model_version, now, response)
+
+    def prune(self, session: Session) -> int:
+        """Delete expired rows and the oldest rows beyond max_rows"""
+        result = session.execute(
+            delete(InferenceCacheEntry).where(
+                col(InferenceCacheEntry.created_at) < self._cutoff()
+            )
+        )
+        deleted: int = result.rowcount  # type: ignore[attr-defined]
+        if self.max_rows <= 0:
+            session.commit()
+            return deleted
+        oldest_kept = session.exec(
+            select(InferenceCacheEntry.created_at)
+            .order_by(col(InferenceCacheEntry.created_at).desc())
+            .offset(self.max_rows - 1)
+            .limit(1)
+        ).first()
+        if oldest_kept is not None:
+            result = session.execute(
+                delete(InferenceCacheEntry).where(
+                    col(InferenceCacheEntry.created_at) < oldest_kept
+                )
+            )
+            deleted += result.rowcount  # type: ignore[attr-defined]
+        session.commit()
+        return deleted
+
+    def _latest_version(self, session: Session) -> str | None:
+        """Version of the newest row, so a restarted process hits at once"""
+        self.model_version = session.exec(
+            select(InferenceCacheEntry.model_version)
+            .order_by(col(InferenceCacheEntry.created_at).desc())
+            .limit(1)
+        ).first()
+        return self.model_version
+
+    def _remember(
+        self,
+        key: str,
+        model_version: str,
+        created_at: datetime,
+        response: InferenceResponse,
+    ) -> None:
+        with self._lock:
+            if model_version != self.model_version:
+                self._lru.clear()
+                self.model_version = model_version
+            self._lru[key] = (created_at, response)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - self.ttl
+
+
+inference_cache = InferenceCache(
+    lru_size=settings.INFERENCE_CACHE_LRU_SIZE,
+    ttl_seconds=settings.INFERENCE_CACHE_TTL_SECONDS,
+    max_rows=settings.INFERENCE_CACHE_MAX_ROWS,
+)
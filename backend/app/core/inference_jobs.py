@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+from sqlalchemy import Row, delete, update
+from sqlmodel import Session, and_, col, or_, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.inference_cache import inference_cache
+from app.core.ml_client import ml_client, predict_batch
+from app.models import InferenceJob, InferenceJobStatus
+from app.schemas import InferenceResponse
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (InferenceJobStatus.done, InferenceJobStatus.failed)
+
+
+class InferenceJobQueue:
+    """Inference jobs queued in Postgres and scored by a pool of worker tasks
+
+    Every backend process runs `workers` tasks. A worker claims up to
+    `batch_size` queued jobs with FOR UPDATE SKIP LOCKED, so no two workers
+    take the same job, and scores them with one ml-service batch request.
+    Workers in this process are woken as soon as a job is enqueued here;
+    jobs enqueued by other processes are found by polling.
+
+    A job whose worker died is claimed again once its lease has expired,
+    and fails after `max_attempts` claims. Finished jobs are deleted after
+    `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int,
+        lease_seconds: float,
+        ttl_seconds: int,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wake = asyncio.Event()
+        # Replaced after every batch, so watchers of its jobs wake at once
+        self._finished = asyncio.Event()
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.workers > 0:
+            self._tasks.append(asyncio.create_task(self._prune_periodically()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, session: Session, prompt: str) -> InferenceJob:
+        job = await asyncio.to_thread(self._insert, session, prompt)
+        if job.status is InferenceJobStatus.queued:
+            self._wake.set()
+        return job
+
+    def load(self, job_id: uuid.UUID) -> InferenceJob | None:
+        with Session(engine) as session:
+            return session.get(InferenceJob, job_id)
+
+    async def watch(self, job_id: uuid.UUID) -> AsyncIterator[InferenceJob]:
+        """Yield the job on every status change until it is finished"""
+        status = None
+        while True:
+            finished = self._finished
+            job = await asyncio.to_thread(self.load, job_id)
+            if job is None:
+                return
+            if job.status != status:
+                status = job.status
+                yield job
+            if status in FINISHED:
+                return
+            try:
+                await asyncio.wait_for(finished.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def prune(self) -> int:
+        """Fail jobs out of attempts and delete expired finished jobs"""
+        now = datetime.now(timezone.utc)
+        with Session(engine) as session:
+            session.execute(
+                update(InferenceJob)
+                .where(col(InferenceJob.status) == InferenceJobStatus.running)
+                .where(col(InferenceJob.started_at) < now - self.lease)
+                .where(col(InferenceJob.attempts) >= self.max_attempts)
+                .values(
+                    status=InferenceJobStatus.failed,
+                    error="Inference job was interrupted too many times",
+                    finished_at=now,
+                )
+            )
+            result = session.execute(
+                delete(InferenceJob).where(
+                    col(InferenceJob.finished_at) < now - self.ttl
+                )
+            )
+            session.commit()
+        deleted: int = result.rowcount  # type: ignore[attr-defined]
+        return deleted
+
+    def _insert(self, session: Session, prompt: str) -> InferenceJob:
+        job = InferenceJob(prompt=prompt)
+        cached = None
+        if settings.INFERENCE_CACHE_ENABLED:
+            cached = inference_cache.get(session, prompt)
+        if cached is not None:
+            job.status = InferenceJobStatus.done
+            job.diagnosis = cached.diagnosis
+            job.recommendations = cached.recommendations
+            job.finished_at = job.created_at
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+    def _claim(self) -> list[Row[Any]]:
+        now = datetime.now(timezone.utc)
+        claimable = (
+            select(InferenceJob.id)
+            .where(
+                or_(
+                    col(InferenceJob.status) == InferenceJobStatus.queued,
+                    and_(
+                        col(InferenceJob.status) == InferenceJobStatus.running,
+                        col(InferenceJob.started_at) < now - self.lease,
+                        col(InferenceJob.attempts) < self.max_attempts,
+                    ),
+                )
+            )
+            .order_by(col(InferenceJob.created_at))
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(InferenceJob)
+            .where(col(InferenceJob.id).in_(claimable.scalar_subquery()))
+            .values(
+                status=InferenceJobStatus.running,
+                started_at=now,
+                attempts=col(InferenceJob.attempts) + 1,
+            )
+            .returning(col(InferenceJob.id), col(InferenceJob.prompt))
+        )
+        with engine.begin() as connection:
+            return list(connection.execute(statement))
+
+    def _complete(self, jobs: list[Row[Any]], results: list[Any]) -> None:
+        now = datetime.now(timezone.utc)
+        with Session(engine) as session:
+            session.execute(
+                update(InferenceJob),
+                [
+                    {
+                        "id": job.id,
+                        "status": InferenceJobStatus.done,
+                        "diagnosis": result["diagnosis"],
+                        "recommendations": result["recommendations"],
+                        "finished_at": now,
+                    }
+                    for job, result in zip(jobs, results, strict=True)
+                ],
+            )
+            session.commit()
+            if settings.INFERENCE_CACHE_ENABLED:
+                for job, result in zip(jobs, results, strict=True):
+                    response = InferenceResponse(
+                        diagnosis=result["diagnosis"],
+                        recommendations=result["recommendations"],
+                    )
+                    inference_cache.put(
+                        session, job.prompt, result["model_version"], response
+                    )
+
+    def _fail(self, jobs: list[Row[Any]], error: str) -> None:
+        with Session(engine) as session:
+            session.execute(
+                update(InferenceJob)
+                .where(col(InferenceJob.id).in_([job.id for job in jobs]))
+                .values(
+                    status=InferenceJobStatus.failed,
+                    error=error,
+                    finished_at=datetime.now(timezone.utc),
+                )
+            )
+            session.commit()
+
+    async def _score(self, jobs: list[Row[Any]]) -> None:
+        try:
+            results = await predict_batch(
+                ml_client.client,
+                [job.prompt for job in jobs],
+                attempts=self.max_attempts,
+                max_wait=10,
+            )
+        except httpx.HTTPStatusError as exc:
+            await asyncio.to_thread(
+                self._fail, jobs, f"ML service error: {exc.response.text}"
+            )
+        except httpx.HTTPError as exc:
+            await asyncio.to_thread(
+                self._fail, jobs, f"Cannot connect to ML service: {exc}"
+            )
+        else:
+            await asyncio.to_thread(self._complete, jobs, results)
+
+        self._finished.set()
+        self._finished = asyncio.Event()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self._claim)
+                if jobs:
+                    await self._score(jobs)
+                    continue
+            except Exception as e:
+                logger.error(f"Inference job worker failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _prune_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease.total_seconds())
+            try:
+                deleted = await asyncio.to_thread(self.prune)
+            except Exception as e:
+                logger.error(f"Failed to prune inference jobs: {str(e)}")
+            else:
+                if deleted:
+                    logger.info(f"Deleted {deleted} expired inference jobs")
+
+
+inference_jobs = InferenceJobQueue(
+    workers=settings.INFERENCE_JOB_WORKERS,
+    batch_size=settings.INFERENCE_JOB_BATCH_SIZE,
+    poll_seconds=settings.INFERENCE_JOB_POLL_SECONDS,
+    max_attempts=settings.INFERENCE_JOB_MAX_ATTEMPTS,
+    lease_seconds=settings.INFERENCE_JOB_LEASE_SECONDS,
+    ttl_seconds=settings.INFERENCE_JOB_TTL_SECONDS,
+)
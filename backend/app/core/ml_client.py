@@ -0,0 +1,174 @@
+import logging
+from typing import Any
+
+import httpx
+from prometheus_client import Gauge
+from tenacity import (
+    AsyncRetrying,
+    before_sleep_log,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from app.core.balancer import BalancedTransport
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_transport(hedge: bool = settings.ML_HEDGE_ENABLED) -> BalancedTransport:
+    """One keep-alive connection pool balanced over the settings.ML_HOST replicas"""
+    pool = httpx.AsyncHTTPTransport(
+        http2=settings.ML_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.ML_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ML_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.ML_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return BalancedTransport(
+        pool,
+        settings.ml_hosts,
+        failure_threshold=settings.ML_BREAKER_FAILURES,
+        reset_seconds=settings.ML_BREAKER_RESET_SECONDS,
+        hedge=hedge,
+    )
+
+
+def create_client(
+    hedge: bool = settings.ML_HEDGE_ENABLED,
+    read_timeout: float = settings.ML_READ_TIMEOUT,
+    transport: BalancedTransport | None = None,
+) -> httpx.AsyncClient:
+    """Client for relative ml-service paths, balanced over settings.ML_HOST"""
+    return httpx.AsyncClient(
+        # Requests are routed to a replica by the transport
+        base_url="http://ml-service",
+        transport=transport or create_transport(hedge),
+        timeout=httpx.Timeout(
+            connect=settings.ML_CONNECT_TIMEOUT,
+            read=read_timeout,
+            write=settings.ML_WRITE_TIMEOUT,
+            pool=settings.ML_POOL_TIMEOUT,
+        ),
+    )
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Network errors, a busy or restarting ml-service"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+async def predict_batch(
+    client: httpx.AsyncClient, prompts: list[str], attempts: int, max_wait: float
+) -> list[Any]:
+    """Score prompts with one /predict/batch call, retrying transient errors
+
+    Waits between attempts grow exponentially up to `max_wait` seconds; the
+    last error is raised after `attempts` tries.
+    """
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception(is_retryable),
+        wait=wait_exponential(multiplier=0.5, max=max_wait),
+        stop=stop_after_attempt(attempts),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    ):
+        with attempt:
+            resp = await client.post(
+                "/api/v1/model/predict/batch", json={"texts": prompts}
+            )
+            resp.raise_for_status()
+    results: list[Any] = resp.json()["results"]
+    return results
+
+
+def is_rejected(exc: BaseException) -> bool:
+    """ml-service refused the input itself, so sending it again cannot help"""
+    return (
+        isinstance(exc, httpx.HTTPStatusError)
+        and exc.response.is_client_error
+        and exc.response.status_code != 429
+    )
+
+
+async def predict_each(
+    client: httpx.AsyncClient, prompts: list[str], attempts: int, max_wait: float
+) -> list[Any | None]:
+    """Like predict_batch, but a prompt ml-service rejects fails only itself
+
+    A batch rejected with a 4xx is sent again prompt by prompt, and the
+    prompts that are rejected on their own get None instead of a result.
+    """
+    try:
+        return await predict_batch(client, prompts, attempts, max_wait)
+    except httpx.HTTPStatusError as e:
+        if not is_rejected(e):
+            raise
+        if len(prompts) == 1:
+            return [None]
+        logger.warning(
+            f"ML service rejected a batch of {len(prompts)} prompts, "
+            f"sending them one by one: {e.response.text}"
+        )
+
+    results: list[Any | None] = []
+    for prompt in prompts:
+        try:
+            results.extend(await predict_batch(client, [prompt], attempts, max_wait))
+        except httpx.HTTPStatusError as e:
+            if not is_rejected(e):
+                raise
+            results.append(None)
+    return results
+
+
+class MLClient:
+    """Long-lived HTTP client for ml-service, opened in the app lifespan
+
+    Every inference reuses the keep-alive connections of one pool instead of
+    paying a TCP handshake per request.
+    """
+
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+        self._transport: BalancedTransport | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("ML client is not started")
+        return self._client
+
+    async def start(self) -> None:
+        self._transport = create_transport()
+        self._client = create_client(transport=self._transport)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._transport = None
+
+    def in_flight(self) -> int:
+        return self._transport.in_flight if self._transport is not None else 0
+
+    def utilization(self) -> float:
+        return self.in_flight() / settings.ML_MAX_CONNECTIONS
+
+
+ml_client = MLClient()
+
+IN_FLIGHT = Gauge(
+    "ml_client_in_flight_requests",
+    "Requests to ml-service in progress over all replicas",
+)
+IN_FLIGHT.set_function(ml_client.in_flight)
+POOL_UTILIZATION = Gauge(
+    "ml_client_pool_utilization",
+    "Requests in progress as a share of ML_MAX_CONNECTIONS (one connection each over HTTP/1.1)",
+)
+POOL_UTILIZATION.set_function(ml_client.utilization)
@@ -1,12 +1,20 @@
+import asyncio
 import logging
 
-from fastapi import FastAPI
-from fastapi.concurrency import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.concurrency import asynccontextmanager, run_in_threadpool
 from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.appointment_scoring import appointment_scorer
 from app.core.config import settings
+from app.core.db import engine
+from app.core.inference_cache import inference_cache
+from app.core.inference_jobs import inference_jobs
+from app.core.ml_client import ml_client
 from app.initial_data import init
 
 logger = logging.getLogger(__name__)
@@ -16,6 +24,22 @@ def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+def prune_inference_cache() -> None:
+    with Session(engine) as session:
+        deleted = inference_cache.prune(session)
+    if deleted:
+        logger.info(f"Pruned {deleted} inference cache rows")
+
+
+async def prune_inference_cache_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.INFERENCE_CACHE_PRUNE_SECONDS)
+        try:
+            await run_in_threadpool(prune_inference_cache)
+        except Exception as e:
+            logger.error(f"Failed to prune inference cache: {str(e)}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # noqa: ARG001
     try:
@@ -27,8 +51,22 @@ async def lifespan(app: FastAPI):  # noqa: ARG001
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
 
+    await ml_client.start()
+    await inference_jobs.start()
+    if settings.APPOINTMENT_SCORING_ENABLED:
+        await appointment_scorer.start()
+    cache_pruner = None
+    if settings.INFERENCE_CACHE_ENABLED:
+        cache_pruner = asyncio.create_task(prune_inference_cache_periodically())
+
     yield
 
+    if cache_pruner is not None:
+        cache_pruner.cancel()
+    await appointment_scorer.stop()
+    await inference_jobs.stop()
+    await ml_client.close()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -49,3 +87,9 @@ if settings.all_cors_origins:
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+@app.get("/metrics", tags=["metrics"], include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus scrape endpoint"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
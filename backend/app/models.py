@@ -2,6 +2,7 @@ import uuid
 from datetime import date, datetime, timezone
 from enum import Enum as PyEnum
 
+from sqlalchemy import DateTime
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -53,6 +54,9 @@ class Appointment(SQLModel, table=True):
     doctor_recommendations: str | None = None
     nlp_recommendations: str | None = None
     nlp_diagnosis: str | None = None
+    # Background scoring attempts, and when the appointment may be claimed again
+    nlp_attempts: int = 0
+    nlp_retry_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
 
     status: AppointmentStatus = Field(default=AppointmentStatus.pending)
 
@@ -72,3 +76,46 @@ class Appointment(SQLModel, table=True):
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc), nullable=False
     )
+
+
+class InferenceCacheEntry(SQLModel, table=True):
+    __tablename__ = "inference_cache"
+
+    prompt_hash: str = Field(primary_key=True, max_length=64)
+    model_version: str = Field(primary_key=True, max_length=255)
+    diagnosis: str
+    recommendations: str
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+        nullable=False,
+        index=True,
+    )
+
+
+class InferenceJobStatus(str, PyEnum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class InferenceJob(SQLModel, table=True):
+    __tablename__ = "inference_jobs"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    prompt: str
+    status: InferenceJobStatus = Field(default=InferenceJobStatus.queued, index=True)
+    attempts: int = 0
+    diagnosis: str | None = None
+    recommendations: str | None = None
+    error: str | None = None
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+        nullable=False,
+    )
+    started_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    finished_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True), index=True
+    )
@@ -4,7 +4,12 @@ from datetime import date, datetime
 from pydantic import EmailStr
 from sqlmodel import Field, SQLModel
 
-from app.models import AppointmentStatus, UserGender, UserRole
+from app.models import (
+    AppointmentStatus,
+    InferenceJobStatus,
+    UserGender,
+    UserRole,
+)
 
 # ————— User schemas —————
 
@@ -134,6 +139,16 @@ class InferenceResponse(SQLModel):
     recommendations: str
 
 
+class InferenceJobPublic(SQLModel):
+    id: uuid.UUID
+    status: InferenceJobStatus
+    diagnosis: str | None
+    recommendations: str | None
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+
 # ————— Base schemas —————
 
 
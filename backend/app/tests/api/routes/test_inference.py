@@ -0,0 +1,140 @@
+import json
+import time
+import uuid
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app.core import ml_client
+from app.core.config import settings
+from app.main import app
+from app.models import InferenceCacheEntry, UserGender
+from app.tests.utils.ml import StubMLService
+from app.utils import build_inference_prompt
+
+RUN_URL = f"{settings.API_V1_STR}/inference/run"
+JOBS_URL = f"{settings.API_V1_STR}/inference/jobs"
+
+
+@pytest.fixture(scope="module")
+def ml_service() -> StubMLService:
+    return StubMLService()
+
+
+@pytest.fixture(scope="module")
+def client(ml_service: StubMLService) -> Generator[TestClient, None, None]:
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(ml_client, "create_transport", ml_service.transport)
+        with TestClient(app) as c:
+            yield c
+
+
+@pytest.fixture(autouse=True)
+def reset(ml_service: StubMLService, db: Session) -> None:
+    ml_service.requests.clear()
+    ml_service.status_code = 200
+    db.execute(delete(InferenceCacheEntry))
+    db.commit()
+
+
+def test_run_inference_is_cached(client: TestClient, ml_service: StubMLService) -> None:
+    payload = {"gender": "female", "age": 33, "complaints": "боль в горле"}
+    prompt = build_inference_prompt(UserGender.female, 33, "боль в горле")
+
+    first = client.post(RUN_URL, json=payload)
+    assert first.status_code == 200
+    assert first.json() == {"diagnosis": f"dx:{prompt}", "recommendations": "rest"}
+    second = client.post(RUN_URL, json=payload)
+    assert second.json() == first.json()
+    assert ml_service.requests == [[prompt]]
+
+    # fresh=true skips the cache
+    client.post(RUN_URL, params={"fresh": True}, json=payload)
+    assert len(ml_service.requests) == 2
+
+
+def test_run_inference_reports_ml_errors(
+    client: TestClient, ml_service: StubMLService
+) -> None:
+    ml_service.status_code = 422
+    payload = {"gender": "male", "age": 40, "complaints": "кашель"}
+    r = client.post(RUN_URL, json=payload)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "ML service error: stub failure"
+
+    # Failed predictions are not cached
+    ml_service.status_code = 200
+    assert client.post(RUN_URL, json=payload).status_code == 200
+
+
+def wait_for_job(client: TestClient, job_id: str) -> dict[str, Any]:
+    deadline = time.monotonic() + 10
+    while True:
+        job: dict[str, Any] = client.get(f"{JOBS_URL}/{job_id}").json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_job_is_scored_in_background(
+    client: TestClient, ml_service: StubMLService
+) -> None:
+    payload = {"gender": "male", "age": 50, "complaints": "боль в пояснице"}
+    prompt = build_inference_prompt(UserGender.male, 50, "боль в пояснице")
+
+    r = client.post(JOBS_URL, json=payload)
+    assert r.status_code == 202
+    assert r.json()["status"] in ("queued", "running", "done")
+
+    job = wait_for_job(client, r.json()["id"])
+    assert job["status"] == "done"
+    assert job["diagnosis"] == f"dx:{prompt}"
+    assert job["recommendations"] == "rest"
+    assert job["finished_at"] is not None
+    assert ml_service.requests == [[prompt]]
+
+    # The result was cached, so the same request is answered at once
+    r = client.post(JOBS_URL, json=payload)
+    assert r.json()["status"] == "done"
+    assert r.json()["diagnosis"] == f"dx:{prompt}"
+    assert len(ml_service.requests) == 1
+
+
+def test_job_fails_on_ml_error(client: TestClient, ml_service: StubMLService) -> None:
+    ml_service.status_code = 422
+    payload = {"gender": "female", "age": 20, "complaints": "сыпь"}
+    r = client.post(JOBS_URL, json=payload)
+
+    job = wait_for_job(client, r.json()["id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "ML service error: stub failure"
+    assert job["diagnosis"] is None
+
+
+def test_job_events_stream_until_finished(client: TestClient) -> None:
+    payload = {"gender": "female", "age": 70, "complaints": "отёки ног"}
+    job_id = client.post(JOBS_URL, json=payload).json()["id"]
+
+    events = []
+    with client.stream("GET", f"{JOBS_URL}/{job_id}/events") as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        for block in r.iter_text():
+            events.extend(block.strip().split("\n\n"))
+    names = [event.splitlines()[0] for event in events]
+    data = [
+        json.loads(event.splitlines()[1].removeprefix("data: ")) for event in events
+    ]
+
+    assert names[-1] == "event: done"
+    assert len(names) == len(set(names))
+    assert all(job["id"] == job_id for job in data)
+    assert data[-1]["diagnosis"].endswith("отёки ног")
+
+
+def test_unknown_job_is_not_found(client: TestClient) -> None:
+    missing = uuid.uuid4()
+    assert client.get(f"{JOBS_URL}/{missing}").status_code == 404
+    assert client.get(f"{JOBS_URL}/{missing}/events").status_code == 404
@@ -0,0 +1,168 @@
+import asyncio
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlmodel import Session, delete, select, update
+
+from app.core.appointment_scoring import AppointmentScorer
+from app.core.config import settings
+from app.core.ml_client import ml_client
+from app.models import Appointment, AppointmentStatus, User
+from app.tests.utils.ml import StubMLService
+
+
+@pytest.fixture
+def ml_service(monkeypatch: pytest.MonkeyPatch) -> StubMLService:
+    service = StubMLService()
+    monkeypatch.setattr(ml_client, "_client", service.client())
+    return service
+
+
+@pytest.fixture
+def scorer() -> AppointmentScorer:
+    return AppointmentScorer(
+        batch_size=2,
+        poll_seconds=0.1,
+        max_attempts=2,
+        lease_seconds=60,
+        backoff_seconds=60,
+    )
+
+
+@pytest.fixture
+def appointments(db: Session) -> Generator[list[Appointment], None, None]:
+    """Three pending appointments to score, plus four to skip"""
+    patient = db.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).one()
+    pending = [
+        Appointment(complaints=f"complaint {i}", patient_id=patient.id)
+        for i in range(3)
+    ]
+    skipped = [
+        Appointment(complaints="known", nlp_diagnosis="known", patient_id=patient.id),
+        Appointment(complaints="", patient_id=patient.id),
+        Appointment(complaints="  \n ", patient_id=None),
+        Appointment(
+            complaints="closed",
+            status=AppointmentStatus.completed,
+            patient_id=patient.id,
+        ),
+    ]
+    db.add_all(pending + skipped)
+    db.commit()
+    yield pending
+    db.execute(delete(Appointment))
+    db.commit()
+
+
+def load(db: Session) -> dict[str | None, Appointment]:
+    db.expire_all()
+    return {a.complaints: a for a in db.exec(select(Appointment)).all()}
+
+
+@pytest.mark.usefixtures("appointments")
+def test_scores_pending_appointments_in_batches(
+    db: Session, ml_service: StubMLService, scorer: AppointmentScorer
+) -> None:
+    assert asyncio.run(scorer.score_pending()) == 2
+    assert asyncio.run(scorer.score_pending()) == 1
+    assert asyncio.run(scorer.score_pending()) == 0
+
+    assert [len(prompts) for prompts in ml_service.requests] == [2, 1]
+    scored = load(db)
+    for prompt in (prompt for prompts in ml_service.requests for prompt in prompts):
+        appointment = scored[prompt.split(", ")[-1]]
+        assert appointment.nlp_diagnosis == f"dx:{prompt}"
+        assert appointment.nlp_recommendations == "rest"
+        assert appointment.nlp_attempts == 1
+        assert appointment.nlp_retry_at is None
+    assert scored["known"].nlp_diagnosis == "known"
+    assert scored[""].nlp_diagnosis is None
+    assert scored["  \n "].nlp_attempts == 0
+    assert scored["closed"].nlp_diagnosis is None
+
+
+def test_claimed_appointments_are_leased(
+    db: Session, scorer: AppointmentScorer, appointments: list[Appointment]
+) -> None:
+    started_at = datetime.now(timezone.utc)
+    first = {row.id for row in scorer._claim()}
+    # Another process can only claim the appointment left over
+    second = {row.id for row in scorer._claim()}
+    assert len(first) == 2
+    assert len(second) == 1
+    assert first.isdisjoint(second)
+    assert scorer._claim() == []
+
+    for appointment in appointments:
+        leased = load(db)[appointment.complaints]
+        assert leased.nlp_attempts == 1
+        assert leased.nlp_retry_at is not None
+        assert leased.nlp_retry_at >= started_at + timedelta(seconds=60)
+
+
+def test_failed_appointments_back_off_and_are_given_up(
+    db: Session,
+    ml_service: StubMLService,
+    scorer: AppointmentScorer,
+    appointments: list[Appointment],
+) -> None:
+    scorer.batch_size = 3
+    ml_service.status_code = 503
+    started_at = datetime.now(timezone.utc)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(scorer.score_pending())
+
+    failed = [load(db)[a.complaints] for a in appointments]
+    for appointment in failed:
+        assert appointment.nlp_attempts == 1
+        assert appointment.nlp_retry_at is not None
+        assert appointment.nlp_retry_at >= started_at + timedelta(seconds=60)
+    # A 503 is retried within the round, but the appointments are not
+    # claimed again before the backoff has passed
+    assert asyncio.run(scorer.score_pending()) == 0
+    assert len(ml_service.requests) == 3
+
+    def expire_backoff() -> None:
+        db.execute(update(Appointment).values(nlp_retry_at=started_at))
+        db.commit()
+
+    expire_backoff()
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(scorer.score_pending())
+    # The second failure waits twice as long
+    retry_at = load(db)[appointments[0].complaints].nlp_retry_at
+    assert retry_at is not None
+    assert retry_at >= started_at + timedelta(seconds=120)
+
+    # Out of attempts, so the appointments are not sent again
+    expire_backoff()
+    ml_service.status_code = 200
+    assert asyncio.run(scorer.score_pending()) == 0
+    assert len(ml_service.requests) == 6
+    assert all(load(db)[a.complaints].nlp_diagnosis is None for a in appointments)
+
+
+def test_rejected_appointments_do_not_fail_their_batch(
+    db: Session,
+    ml_service: StubMLService,
+    scorer: AppointmentScorer,
+    appointments: list[Appointment],
+) -> None:
+    scorer.batch_size = 3
+    ml_service.rejected = {"complaint 1"}
+    assert asyncio.run(scorer.score_pending()) == 3
+
+    # The rejected batch was sent again prompt by prompt
+    assert [len(prompts) for prompts in ml_service.requests] == [3, 1, 1, 1]
+    scored = load(db)
+    rejected = scored["complaint 1"]
+    assert rejected.nlp_diagnosis is None
+    assert rejected.nlp_attempts == scorer.max_attempts
+    assert rejected.nlp_retry_at is None
+    for appointment in (appointments[0], appointments[2]):
+        assert scored[appointment.complaints].nlp_diagnosis is not None
+
+    # Given up, so it is not claimed again
+    assert asyncio.run(scorer.score_pending()) == 0
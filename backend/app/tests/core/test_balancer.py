@@ -0,0 +1,88 @@
+import asyncio
+from typing import cast
+
+import httpx
+
+from app.core.balancer import BalancedTransport, BreakerState
+
+
+def make_transport(
+    handler: httpx.MockTransport, urls: list[str], reset_seconds: float = 30.0
+) -> BalancedTransport:
+    return BalancedTransport(
+        cast(httpx.AsyncHTTPTransport, handler),
+        urls,
+        failure_threshold=2,
+        reset_seconds=reset_seconds,
+    )
+
+
+def predict(transport: BalancedTransport) -> httpx.Response:
+    request = httpx.Request("POST", "http://ml-service/api/v1/model/predict")
+    return asyncio.run(transport.handle_async_request(request))
+
+
+def state(transport: BalancedTransport) -> BreakerState:
+    return transport.replicas[0].state
+
+
+def test_routes_to_replica_with_fewest_outstanding_requests() -> None:
+    hosts: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        return httpx.Response(200)
+
+    transport = make_transport(httpx.MockTransport(handler), ["http://a", "http://b"])
+    transport.replicas[0].outstanding = 3
+    predict(transport)
+    assert hosts == ["b"]
+
+
+def test_refused_connection_moves_to_another_replica() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "a":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"host": request.url.host})
+
+    transport = make_transport(httpx.MockTransport(handler), ["http://a", "http://b"])
+    # Keep "a" the least loaded replica so it is picked until its breaker opens
+    transport.replicas[1].outstanding = 1
+    for _ in range(4):
+        assert predict(transport).json() == {"host": "b"}
+    assert state(transport) is BreakerState.open
+
+
+def test_half_open_probe_closes_breaker() -> None:
+    healthy = False
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200 if healthy else 503)
+
+    transport = make_transport(
+        httpx.MockTransport(handler), ["http://a"], reset_seconds=0.0
+    )
+    predict(transport)
+    predict(transport)
+    assert state(transport) is BreakerState.open
+
+    # A failed probe opens the breaker again, a successful one closes it
+    predict(transport)
+    assert state(transport) is BreakerState.open
+    healthy = True
+    assert predict(transport).status_code == 200
+    assert state(transport) is BreakerState.closed
+
+
+def test_counts_requests_in_flight() -> None:
+    seen: list[int] = []
+    transport: BalancedTransport
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        seen.append(transport.in_flight)
+        return httpx.Response(200)
+
+    transport = make_transport(httpx.MockTransport(handler), ["http://a", "http://b"])
+    predict(transport)
+    assert seen == [1]
+    assert transport.in_flight == 0
@@ -0,0 +1,26 @@
+from sqlalchemy import inspect, text
+from sqlmodel import Session
+
+from app.core.db import engine, init_db
+
+
+def appointment_columns() -> set[str]:
+    return {column["name"] for column in inspect(engine).get_columns("appointments")}
+
+
+def test_init_db_adds_missing_columns_to_existing_tables(db: Session) -> None:
+    db.commit()
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "ALTER TABLE appointments"
+                " DROP COLUMN nlp_attempts, DROP COLUMN nlp_retry_at"
+            )
+        )
+    assert "nlp_attempts" not in appointment_columns()
+
+    init_db(db)
+    assert {"nlp_attempts", "nlp_retry_at"} <= appointment_columns()
+    # Running it again changes nothing
+    init_db(db)
+    assert {"nlp_attempts", "nlp_retry_at"} <= appointment_columns()
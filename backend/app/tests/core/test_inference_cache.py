@@ -0,0 +1,96 @@
+from collections.abc import Generator
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session, col, delete, func, select
+
+from app.core.inference_cache import InferenceCache, prompt_hash
+from app.models import InferenceCacheEntry
+from app.schemas import InferenceResponse
+
+RESPONSE = InferenceResponse(diagnosis="ОРВИ", recommendations="rest")
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(db: Session) -> Generator[None, None, None]:
+    db.execute(delete(InferenceCacheEntry))
+    db.commit()
+    yield
+    db.execute(delete(InferenceCacheEntry))
+    db.commit()
+
+
+def make_cache(lru_size: int = 10, max_rows: int = 100) -> InferenceCache:
+    return InferenceCache(lru_size=lru_size, ttl_seconds=60, max_rows=max_rows)
+
+
+def test_miss_then_hit(db: Session) -> None:
+    cache = make_cache()
+    assert cache.get(db, "кашель") is None
+    cache.put(db, "кашель", "v1", RESPONSE)
+    assert cache.get(db, "кашель") == RESPONSE
+
+    # Another process starts with an empty LRU and reads the shared row
+    other = make_cache()
+    assert other.get(db, "кашель") == RESPONSE
+    assert other.model_version == "v1"
+
+
+def test_put_replaces_existing_row(db: Session) -> None:
+    cache = make_cache()
+    cache.put(db, "кашель", "v1", RESPONSE)
+    updated = InferenceResponse(diagnosis="бронхит", recommendations="")
+    cache.put(db, "кашель", "v1", updated)
+    assert make_cache().get(db, "кашель") == updated
+    assert db.exec(select(func.count()).select_from(InferenceCacheEntry)).one() == 1
+
+
+def test_expired_entries_are_misses(db: Session) -> None:
+    cache = make_cache()
+    cache.put(db, "кашель", "v1", RESPONSE)
+    db.execute(
+        update(InferenceCacheEntry).values(
+            created_at=InferenceCacheEntry.created_at - timedelta(minutes=2)
+        )
+    )
+    db.commit()
+    assert make_cache().get(db, "кашель") is None
+
+    # The LRU entry is older than the TTL as well
+    cache.ttl = timedelta(0)
+    assert cache.get(db, "кашель") is None
+
+
+def test_new_model_version_switches_cache(db: Session) -> None:
+    cache = make_cache()
+    cache.put(db, "кашель", "v1", RESPONSE)
+    cache.put(db, "сыпь", "v2", RESPONSE)
+    assert cache.get(db, "кашель") is None
+    assert cache.get(db, "сыпь") == RESPONSE
+
+
+def test_lru_evicts_least_recently_used(db: Session) -> None:
+    cache = make_cache(lru_size=2)
+    for prompt in ("a", "b", "c"):
+        cache.put(db, prompt, "v1", RESPONSE)
+    db.execute(delete(InferenceCacheEntry))
+    db.commit()
+    assert cache.get(db, "a") is None
+    assert cache.get(db, "c") == RESPONSE
+
+
+def test_prune_deletes_expired_and_oldest_rows(db: Session) -> None:
+    cache = make_cache(max_rows=2)
+    for prompt in ("a", "b", "c", "d"):
+        cache.put(db, prompt, "v1", RESPONSE)
+    db.execute(
+        update(InferenceCacheEntry)
+        .where(col(InferenceCacheEntry.prompt_hash) == prompt_hash("a"))
+        .values(created_at=InferenceCacheEntry.created_at - timedelta(minutes=2))
+    )
+    db.commit()
+
+    assert cache.prune(db) == 2
+    kept = db.exec(select(InferenceCacheEntry.prompt_hash)).all()
+    assert sorted(kept) == sorted([prompt_hash("c"), prompt_hash("d")])
@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+from collections.abc import Generator
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from sqlmodel import Session, delete, select
+
+from app import backfill_nlp
+from app.backfill_nlp import backfill, load_checkpoint, save_checkpoint
+from app.core.config import settings
+from app.core.ml_client import is_retryable
+from app.models import Appointment, User, UserGender
+from app.tests.utils.ml import StubMLService
+from app.utils import age_on, build_inference_prompt
+
+
+def test_age_on_counts_full_years() -> None:
+    assert age_on(date(1990, 6, 1), date(2024, 5, 31)) == 33
+    assert age_on(date(1990, 6, 1), date(2024, 6, 1)) == 34
+
+
+def test_build_inference_prompt() -> None:
+    assert (
+        build_inference_prompt(UserGender.female, 33, "боль в горле")
+        == "Женщина, 33 лет, боль в горле"
+    )
+    assert build_inference_prompt(None, None, "кашель") == "кашель"
+
+
+def test_checkpoint_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "checkpoint.json"
+    assert load_checkpoint(path) is None
+
+    last_id = uuid.uuid4()
+    save_checkpoint(path, last_id)
+    assert load_checkpoint(path) == last_id
+
+
+def test_retries_only_transient_errors() -> None:
+    request = httpx.Request("POST", "http://ml/api/v1/model/predict/batch")
+
+    def status_error(code: int) -> httpx.HTTPStatusError:
+        response = httpx.Response(code, request=request)
+        return httpx.HTTPStatusError("error", request=request, response=response)
+
+    assert is_retryable(status_error(503))
+    assert is_retryable(status_error(429))
+    assert not is_retryable(status_error(422))
+    assert is_retryable(httpx.ConnectError("refused", request=request))
+
+
+@pytest.fixture
+def ml_service(monkeypatch: pytest.MonkeyPatch) -> StubMLService:
+    service = StubMLService()
+
+    def create_client(**_kwargs: Any) -> httpx.AsyncClient:
+        return service.client()
+
+    monkeypatch.setattr(backfill_nlp, "create_client", create_client)
+    return service
+
+
+@pytest.fixture
+def appointments(db: Session) -> Generator[list[Appointment], None, None]:
+    """Five pending appointments in primary key order, plus three to skip"""
+    patient = db.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).one()
+    pending = [
+        Appointment(complaints=f"complaint {i}", patient_id=patient.id)
+        for i in range(5)
+    ]
+    skipped = [
+        Appointment(complaints="old", nlp_diagnosis="known", patient_id=patient.id),
+        Appointment(complaints="", patient_id=patient.id),
+        Appointment(complaints=" \t", patient_id=None),
+    ]
+    db.add_all(pending + skipped)
+    db.commit()
+    yield sorted(pending, key=lambda appointment: appointment.id)
+    db.execute(delete(Appointment))
+    db.commit()
+
+
+def diagnoses(db: Session) -> dict[str | None, str | None]:
+    db.expire_all()
+    return {a.complaints: a.nlp_diagnosis for a in db.exec(select(Appointment)).all()}
+
+
+def test_backfill_scores_pending_appointments_in_batches(
+    db: Session,
+    tmp_path: Path,
+    ml_service: StubMLService,
+    appointments: list[Appointment],
+) -> None:
+    checkpoint = tmp_path / "checkpoint.json"
+    asyncio.run(backfill(checkpoint, batch_size=2, concurrency=2, limit=None))
+
+    assert [len(batch) for batch in ml_service.requests] == [2, 2, 1]
+    prompts = [prompt for batch in ml_service.requests for prompt in batch]
+    # Sent in primary key order, with the patient's gender and age
+    assert [prompt.split(", ")[-1] for prompt in prompts] == [
+        appointment.complaints for appointment in appointments
+    ]
+    assert all(prompt.startswith("Мужчина, ") for prompt in prompts)
+    scored = diagnoses(db)
+    for prompt in prompts:
+        assert scored[prompt.split(", ")[-1]] == f"dx:{prompt}"
+    # Appointments with a diagnosis or without complaints are skipped
+    assert scored["old"] == "known"
+    assert scored[""] is None
+    assert scored[" \t"] is None
+    assert load_checkpoint(checkpoint) == appointments[-1].id
+
+
+def test_backfill_resumes_after_checkpoint(
+    db: Session,
+    tmp_path: Path,
+    ml_service: StubMLService,
+    appointments: list[Appointment],
+) -> None:
+    checkpoint = tmp_path / "checkpoint.json"
+    asyncio.run(backfill(checkpoint, batch_size=2, concurrency=1, limit=2))
+    assert load_checkpoint(checkpoint) == appointments[1].id
+    assert [diagnoses(db)[a.complaints] is None for a in appointments] == [
+        False,
+        False,
+        True,
+        True,
+        True,
+    ]
+
+    asyncio.run(backfill(checkpoint, batch_size=2, concurrency=1, limit=None))
+    assert [len(batch) for batch in ml_service.requests] == [2, 2, 1]
+    assert all(diagnoses(db)[a.complaints] is not None for a in appointments)
+    assert load_checkpoint(checkpoint) == appointments[-1].id
+
+
+def test_backfill_skips_rejected_appointments(
+    db: Session,
+    tmp_path: Path,
+    ml_service: StubMLService,
+    appointments: list[Appointment],
+) -> None:
+    rejected = appointments[2].complaints
+    assert rejected is not None
+    ml_service.rejected = {rejected}
+    checkpoint = tmp_path / "checkpoint.json"
+    asyncio.run(backfill(checkpoint, batch_size=2, concurrency=2, limit=None))
+
+    # The batch with the rejected appointment was sent again one by one
+    assert [len(batch) for batch in ml_service.requests] == [2, 2, 1, 1, 1]
+    scored = diagnoses(db)
+    assert scored[rejected] is None
+    assert all(
+        scored[a.complaints] is not None
+        for a in appointments
+        if a.complaints != rejected
+    )
+    assert load_checkpoint(checkpoint) == appointments[-1].id
@@ -0,0 +1,58 @@
+import json
+from typing import cast
+
+import httpx
+
+from app.core.balancer import BalancedTransport
+
+
+class StubMLService:
+    """ml-service stand-in that diagnoses every prompt as "dx:<prompt>"
+
+    Records the prompts of every request; `status_code` makes it fail, and
+    requests with a prompt ending in one of `rejected` get a 400.
+    """
+
+    def __init__(self) -> None:
+        self.requests: list[list[str]] = []
+        self.status_code = 200
+        self.rejected: set[str] = set()
+        self.model_version = "v1"
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/predict/batch"):
+            prompts = json.loads(request.content)["texts"]
+        else:
+            prompts = [request.url.params["text"]]
+        self.requests.append(prompts)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, text="stub failure")
+        if any(prompt.endswith(tuple(self.rejected)) for prompt in prompts):
+            return httpx.Response(400, text="stub rejected")
+
+        results = [self.result(prompt) for prompt in prompts]
+        if request.url.path.endswith("/predict/batch"):
+            return httpx.Response(200, json={"results": results})
+        return httpx.Response(200, json=results[0])
+
+    def result(self, prompt: str) -> dict[str, str]:
+        return {
+            "diagnosis": f"dx:{prompt}",
+            "recommendations": "rest",
+            "stage": "roberta",
+            "model_version": self.model_version,
+        }
+
+    def transport(self, hedge: bool = False) -> BalancedTransport:
+        return BalancedTransport(
+            cast(httpx.AsyncHTTPTransport, httpx.MockTransport(self.handle)),
+            ["http://ml-service"],
+            failure_threshold=1000,
+            reset_seconds=0.0,
+            hedge=hedge,
+        )
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=self.transport(), base_url="http://ml-service"
+        )
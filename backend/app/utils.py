@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
@@ -11,6 +11,7 @@ from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.models import UserGender
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -121,3 +122,22 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+def age_on(birth_date: date, day: date) -> int:
+    """Full years between birth_date and day"""
+    had_birthday = (day.month, day.day) >= (birth_date.month, birth_date.day)
+    return day.year - birth_date.year - (0 if had_birthday else 1)
+
+
+def build_inference_prompt(
+    gender: UserGender | None, age: int | None, complaints: str
+) -> str:
+    """Prompt in the "<Мужчина|Женщина>, <age> лет, <complaints>" form the model expects"""
+    parts = []
+    if gender is not None:
+        parts.append("Мужчина" if gender == UserGender.male else "Женщина")
+    if age is not None:
+        parts.append(f"{age} лет")
+    parts.append(complaints)
+    return ", ".join(parts)
@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+MODEL_DIR = Path(os.getenv("MODEL_DIR", BASE_DIR / "data" / "bert"))
+
+# Versioned checkpoints live in subdirectories of the registry; MODEL_DIR is
+# served when the registry is empty
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", BASE_DIR / "data" / "models"))
+# How often each worker checks the registry CURRENT file for a new version
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "10"))
+# Required in the X-Admin-Token header; admin endpoints are disabled without it
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Micro-batching of concurrent /predict calls
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# /predict/batch endpoint
+BATCH_ENDPOINT_MAX_ITEMS = int(os.getenv("BATCH_ENDPOINT_MAX_ITEMS", "1000"))
+PREDICT_CHUNK_SIZE = int(os.getenv("PREDICT_CHUNK_SIZE", "32"))
+
+# /predict/stream endpoint: texts per batch, batches computed ahead of the
+# response, and the longest accepted input line
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "64"))
+STREAM_MAX_PENDING_BATCHES = int(os.getenv("STREAM_MAX_PENDING_BATCHES", "4"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+# Server processes (see app/gunicorn_conf.py); with more than one worker the
+# model is loaded once in the master process and shared copy-on-write
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+# Dedicated inference executor and backpressure. By default
+# SERVER_WORKERS * INFERENCE_WORKERS * TORCH_NUM_THREADS matches the core count.
+CPU_COUNT = os.cpu_count() or 1
+INFERENCE_WORKERS = int(
+    os.getenv("INFERENCE_WORKERS", str(max(1, CPU_COUNT // SERVER_WORKERS)))
+)
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+TORCH_NUM_THREADS = int(
+    os.getenv(
+        "TORCH_NUM_THREADS",
+        str(max(1, CPU_COUNT // (SERVER_WORKERS * INFERENCE_WORKERS))),
+    )
+)
+
+# Inference backend: "torch", "onnx" or "auto" (ONNX when model.onnx is present)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto")
+ONNX_MODEL_FILE = "model.onnx"
+
+# Reduced precision for the torch backend: "fp32", "int8" or "bf16"
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+PRECISION_MIN_AGREEMENT = float(os.getenv("PRECISION_MIN_AGREEMENT", "0.98"))
+# Agreement measured on fewer held-out samples is too noisy to trust
+PRECISION_MIN_SAMPLES = int(os.getenv("PRECISION_MIN_SAMPLES", "200"))
+PRECISION_SAMPLES_PATH = (
+    Path(os.environ["PRECISION_SAMPLES_PATH"])
+    if os.getenv("PRECISION_SAMPLES_PATH")
+    else None
+)
+
+# Token-length bucket boundaries; texts of similar length are padded together.
+# An empty value disables bucketing and keeps the input order.
+LENGTH_BUCKETS = [
+    int(boundary)
+    for boundary in os.getenv("LENGTH_BUCKETS", "16,32,64,128,256").split(",")
+    if boundary.strip()
+]
+MAX_SEQUENCE_LENGTH = 512
+
+# Sequence-length policy: "head:N" keeps the first N tokens,
+# "head_tail:N:T" keeps N tokens of which the last T are from the end of the text
+TRUNCATION_POLICY = os.getenv("TRUNCATION_POLICY", f"head:{MAX_SEQUENCE_LENGTH}")
+
+# In-process prediction cache; a size of 0 disables it
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+
+# Optional on-disk cache shared by all workers and kept across restarts;
+# disabled unless a path is given
+PREDICTION_DISK_CACHE_PATH = (
+    Path(os.environ["PREDICTION_DISK_CACHE_PATH"])
+    if os.getenv("PREDICTION_DISK_CACHE_PATH")
+    else None
+)
+PREDICTION_DISK_CACHE_MAX_ENTRIES = int(
+    os.getenv("PREDICTION_DISK_CACHE_MAX_ENTRIES", "1000000")
+)
+PREDICTION_DISK_CACHE_TTL_SECONDS = float(
+    os.getenv("PREDICTION_DISK_CACHE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+
+# "background" opens the port immediately and loads the model afterwards,
+# "blocking" loads the model before the server starts accepting requests
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background")
+
+# Torch execution mode: "eager", "trace" (TorchScript) or "compile" (torch.compile).
+# In compiled modes batches are padded up to their LENGTH_BUCKETS boundary.
+TORCH_EXECUTION_MODE = os.getenv("TORCH_EXECUTION_MODE", "eager")
+
+# Two-stage cascade: a TF-IDF linear model trained by `python -m app.train_cascade`
+# answers directly when its calibrated confidence reaches the threshold
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.9"))
+CASCADE_MODEL_FILE = "cascade.joblib"
@@ -0,0 +1,102 @@
+"""Export the RoBERTa checkpoint to an optimized ONNX graph.
+
+Usage: python -m app.export_onnx [--model-dir PATH]
+
+The exported graph is written next to the checkpoint as `model.onnx`, with
+attention and GELU fused by the ONNX Runtime transformer optimizer. The
+export is rejected if ONNX Runtime does not reproduce the PyTorch labels on
+the sample texts.
+"""
+
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import onnxruntime as ort
+import torch
+from onnxruntime.transformers import optimizer
+from transformers import AutoTokenizer, RobertaForSequenceClassification
+
+from app import config
+from app.samples import SAMPLE_TEXTS
+from app.services.registry import model_registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def export(model_dir: Path, output_path: Path) -> None:
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = RobertaForSequenceClassification.from_pretrained(model_dir)
+    model.eval()  # type: ignore[no-untyped-call]
+
+    inputs = tokenizer(SAMPLE_TEXTS, return_tensors="pt", padding=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_path = Path(tmp_dir) / "model.raw.onnx"
+        torch.onnx.export(
+            model,
+            (inputs["input_ids"], inputs["attention_mask"]),
+            str(raw_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+
+        optimized = optimizer.optimize_model(
+            str(raw_path),
+            model_type="bert",
+            num_heads=model.config.num_attention_heads,
+            hidden_size=model.config.hidden_size,
+        )
+        logger.info("Fused operators: %s", optimized.get_fused_operator_statistics())
+        optimized.save_model_to_file(str(output_path))
+
+    verify(model, tokenizer, output_path)
+
+
+def verify(
+    model: RobertaForSequenceClassification, tokenizer: Any, onnx_path: Path
+) -> None:
+    """Check that ONNX Runtime predicts the same classes as PyTorch"""
+    inputs = tokenizer(SAMPLE_TEXTS, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        expected = torch.argmax(model(**inputs).logits, dim=1).tolist()
+
+    session = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+    (logits,) = session.run(
+        ["logits"],
+        {
+            "input_ids": inputs["input_ids"].numpy(),
+            "attention_mask": inputs["attention_mask"].numpy(),
+        },
+    )
+    actual = logits.argmax(axis=1).tolist()
+
+    if actual != expected:
+        onnx_path.unlink()
+        raise RuntimeError(
+            f"ONNX predictions {actual} differ from PyTorch predictions {expected}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", type=Path, default=model_registry.resolve()[1])
+    args = parser.parse_args()
+
+    output_path = args.model_dir / config.ONNX_MODEL_FILE
+    logger.info("Exporting %s to %s", args.model_dir, output_path)
+    export(args.model_dir, output_path)
+    logger.info("ONNX model exported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Gunicorn settings for serving ml-service with several worker processes.
+
+Usage: gunicorn -c app/gunicorn_conf.py app.main:app
+
+With SERVER_WORKERS > 1 the torch model is loaded once in the master process
+before the workers are forked, so all workers share the weight pages
+copy-on-write instead of each holding its own copy. The master loads the
+model with a single torch thread so no OpenMP pool exists at fork time; every
+worker then sets its own TORCH_NUM_THREADS.
+"""
+
+import gc
+import logging
+import os
+from typing import Any
+
+from app.config import SERVER_WORKERS, TORCH_NUM_THREADS
+from app.services.ml_service import ml_service, resolve_backend
+from app.services.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = SERVER_WORKERS
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = workers > 1
+timeout = 120
+
+
+# gunicorn ships no type information, so its arbiter and workers are Any
+def on_starting(server: Any) -> None:  # noqa: ARG001
+    if not preload_app:
+        return
+    _, model_dir = model_registry.resolve()
+    if resolve_backend(model_dir) != "torch":
+        # ONNX Runtime sessions do not survive fork; each worker loads its own
+        logger.warning("Preloading is only supported for the torch backend")
+        return
+
+    ml_service.load(num_threads=1)
+    # Keep the loaded objects out of the garbage collector so that collections
+    # in the workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def child_exit(server: Any, worker: Any) -> None:  # noqa: ARG001
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)  # type: ignore[no-untyped-call]
+
+
+def post_fork(server: Any, worker: Any) -> None:  # noqa: ARG001
+    if ml_service.ready and ml_service.backend == "torch":
+        import torch
+
+        torch.set_num_threads(TORCH_NUM_THREADS)
@@ -1,14 +1,24 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
 from sqlmodel import SQLModel
+from starlette.middleware.base import RequestResponseEndpoint
 
+from . import config
 from .database import engine
 from .initial_data import load_initial_data
-from .routes import inference
-from .services.ml_service import MLService
+from .routes import admin, inference
+from .services import metrics
+from .services.batcher import batcher
+from .services.disk_cache import disk_prediction_cache
+from .services.executor import inference_executor
+from .services.ml_service import ml_service
+from .services.recommendations import recommendation_index
+from .services.registry import model_registry
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,18 +28,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):  # noqa: ARG001
-    """Initialize services before app starts"""
-    # Initialize ML Service
+async def load_model() -> None:
     try:
         logger.info("Initializing ML Service...")
-        MLService()
+        await asyncio.to_thread(ml_service.load)
         logger.info("ML Service initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize ML Service: {str(e)}")
         raise
 
+
+async def load_model_in_background() -> None:
+    try:
+        await load_model()
+    except Exception:
+        # The error is kept in ml_service.load_error and fails the probes
+        pass
+
+
+async def watch_registry() -> None:
+    """Follow the registry CURRENT file, e.g. after a swap in another worker"""
+    while True:
+        await asyncio.sleep(config.MODEL_REGISTRY_POLL_SECONDS)
+        try:
+            version = model_registry.active()
+        except Exception as e:
+            logger.error(f"Failed to read model registry: {str(e)}")
+            continue
+        swap = ml_service.swap_status
+        if (
+            version is None
+            or not ml_service.ready
+            or version == ml_service.current.name
+            # Retry a failed version only after CURRENT changes again
+            or (swap["state"] == "failed" and swap["target"] == version)
+        ):
+            continue
+        admin.schedule_swap(version)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):  # noqa: ARG001
+    """Initialize services before app starts"""
     try:
         logger.info("Initializing database...")
         SQLModel.metadata.create_all(engine)
@@ -37,26 +77,90 @@ async def lifespan(app: FastAPI):  # noqa: ARG001
             load_initial_data()
         except Exception as e:
             raise RuntimeError(f"Failed to load initial data: {str(e)}") from e
+        recommendation_index.load(engine)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
 
+    await batcher.start()
+
+    model_loader = None
+    if config.MODEL_LOAD_MODE == "blocking":
+        await load_model()
+    else:
+        model_loader = asyncio.create_task(load_model_in_background())
+
+    registry_watcher = None
+    if config.MODEL_REGISTRY_POLL_SECONDS > 0:
+        registry_watcher = asyncio.create_task(watch_registry())
+
     yield
 
+    if model_loader is not None:
+        model_loader.cancel()
+    if registry_watcher is not None:
+        registry_watcher.cancel()
+    await batcher.stop()
+    inference_executor.shutdown()
+    disk_prediction_cache.close()
+
 
 app = FastAPI(
     lifespan=lifespan, version="0.0.1", docs_url=None, redoc_url=None, openapi_url=None
 )
 
 app.include_router(inference.router)
+app.include_router(admin.router)
+
+# Only known paths get a label so that scans of random URLs add no series
+INSTRUMENTED_PATHS = {
+    route.path for route in inference.router.routes if isinstance(route, APIRoute)
+}
+
+
+@app.middleware("http")
+async def record_request_metrics(
+    request: Request, call_next: RequestResponseEndpoint
+) -> Response:
+    endpoint = request.url.path
+    if endpoint not in INSTRUMENTED_PATHS:
+        return await call_next(request)
+    with metrics.IN_FLIGHT.labels(endpoint=endpoint).track_inprogress():
+        with metrics.REQUEST_SECONDS.labels(endpoint=endpoint).time():
+            return await call_next(request)
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Prometheus scrape endpoint"""
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
+    """Liveness probe: fails only if the model could not be loaded at all"""
+    if ml_service.load_error is not None:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"status": "unhealthy", "detail": ml_service.load_error},
+        )
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+async def readiness_check() -> dict[str, str]:
+    """Readiness probe: passes once the model is loaded and warmed up"""
+    if not ml_service.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is loading",
+        )
+    return {"status": "ready", "model_version": ml_service.model_version}
+
+
 # @app.get("/")
 # async def root():
 #     return RedirectResponse(url="/docs")
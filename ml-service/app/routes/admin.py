@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import secrets
+from typing import Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import BaseModel
+
+from app import config
+from app.services.ml_service import ml_service
+from app.services.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def verify_admin_token(x_admin_token: str | None = Header(default=None)) -> None:
+    if config.ADMIN_TOKEN is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled: ADMIN_TOKEN is not set",
+        )
+    if x_admin_token is None or not secrets.compare_digest(
+        x_admin_token, config.ADMIN_TOKEN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token"
+        )
+
+
+router = APIRouter(prefix="/api/v1/admin", dependencies=[Depends(verify_admin_token)])
+
+
+class SwapRequest(BaseModel):
+    version: str
+
+
+def model_status() -> dict[str, Any]:
+    return {
+        "model_version": ml_service.model_version if ml_service.ready else None,
+        "active": model_registry.active(),
+        "versions": model_registry.versions(),
+        "swap": ml_service.swap_status,
+    }
+
+
+swap_task: asyncio.Task[None] | None = None
+
+
+async def swap_model(version: str) -> None:
+    try:
+        await asyncio.to_thread(ml_service.swap, version)
+    except Exception:
+        # The error is kept in ml_service.swap_status and reported by /model
+        pass
+
+
+def schedule_swap(version: str) -> bool:
+    """Start swapping to `version` unless a swap is already running"""
+    global swap_task
+    if ml_service.swapping or (swap_task is not None and not swap_task.done()):
+        return False
+    logger.info(f"Swapping model to version {version}")
+    swap_task = asyncio.create_task(swap_model(version))
+    return True
+
+
+@router.get(
+    "/model",
+    operation_id="model_status",
+    summary="Текущая версия модели и состояние замены",
+    tags=["Admin"],
+)
+async def get_model_status() -> dict[str, Any]:
+    """
+    Возвращает обслуживающую версию модели, версии в реестре
+    и результат последней замены модели.
+    """
+    return model_status()
+
+
+@router.post(
+    "/model/swap",
+    status_code=status.HTTP_202_ACCEPTED,
+    operation_id="swap_model",
+    summary="Замена модели без перезапуска",
+    tags=["Admin"],
+    responses={
+        202: {"description": "Swap started"},
+        404: {"description": "Unknown model version"},
+        409: {"description": "Another swap is in progress"},
+        503: {"description": "Model is loading"},
+    },
+)
+async def start_swap(payload: SwapRequest) -> dict[str, str]:
+    """
+    Загружает версию из реестра в фоне, пока текущая модель продолжает
+    обслуживать запросы, и после прогрева атомарно переключается на неё.
+    Ход замены отслеживается через GET /model.
+    """
+    if not ml_service.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is loading, retry later",
+        )
+    if payload.version not in model_registry.versions():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model version: {payload.version}",
+        )
+    if not schedule_swap(payload.version):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another model swap is in progress",
+        )
+    return {"status": "started", "target": payload.version}
@@ -1,12 +1,27 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from sqlmodel import Session, select
+from fastapi import APIRouter, HTTPException, Request, status
+from pydantic import BaseModel, Field
 
-from app.database import get_session
-from app.models import Recommendation
-from app.services.ml_service import ml_service
+from app import config
+from app.services import metrics
+from app.services.batcher import batcher
+from app.services.cache import normalize_text, prediction_cache
+from app.services.cascade import STAGE_MODEL, STAGE_TFIDF
+from app.services.disk_cache import CachedLabel, disk_prediction_cache
+from app.services.executor import QueueFullError, inference_executor
+from app.services.ml_service import LoadedModel, ml_service
+from app.services.ndjson import (
+    NDJSONStreamingResponse,
+    encode,
+    iter_lines,
+    parse_item,
+)
+from app.services.recommendations import recommendation_index
+from app.services.singleflight import predictions_in_flight
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +31,144 @@ router = APIRouter(prefix="/api/v1/model")
 class PredictionResponse(BaseModel):
     diagnosis: str
     recommendations: str
+    stage: str
+    model_version: str
+
+
+class BatchPredictionRequest(BaseModel):
+    texts: list[str] = Field(min_length=1, max_length=config.BATCH_ENDPOINT_MAX_ITEMS)
+
+
+class BatchPredictionResponse(BaseModel):
+    results: list[PredictionResponse]
+
+
+def build_response(disease: str, stage: str, model_version: str) -> dict[str, str]:
+    with metrics.RECOMMENDATION_SECONDS.time():
+        recommendations = recommendation_index.get(disease)
+    if not recommendations:
+        logger.warning(f"No recommendations found for disease: {disease}")
+
+    return {
+        "diagnosis": disease,
+        "recommendations": recommendations,
+        "stage": stage,
+        "model_version": model_version,
+    }
+
+
+def load_disk_labels(texts: list[str], version: str) -> dict[str, CachedLabel]:
+    labels = {}
+    for text in texts:
+        label = disk_prediction_cache.get(text, version)
+        if label is not None:
+            labels[text] = label
+    return labels
+
+
+def save_disk_labels(version: str, predictions: dict[str, dict[str, str]]) -> None:
+    for text, response in predictions.items():
+        disk_prediction_cache.put(
+            text, version, response["diagnosis"], response["stage"]
+        )
+
+
+async def cached_predictions(
+    texts: list[str], model: LoadedModel
+) -> dict[str, dict[str, str]]:
+    """Look the texts up in memory, then the misses in the shared disk cache"""
+    found = {}
+    missing = []
+    for text in texts:
+        cached = prediction_cache.get(text, model.cache_key)
+        if cached is not None:
+            metrics.PREDICTIONS.labels(stage="cache").inc()
+            found[text] = cached
+        else:
+            missing.append(text)
+    if not missing or not disk_prediction_cache.enabled:
+        return found
+
+    # SQLite can wait for a lock held by another worker, so it runs off the loop
+    labels = await asyncio.to_thread(load_disk_labels, missing, model.cache_key)
+    for text, label in labels.items():
+        metrics.PREDICTIONS.labels(stage="disk_cache").inc()
+        found[text] = build_response(*label, model.cache_key)
+        prediction_cache.put(text, model.cache_key, found[text])
+    return found
+
+
+async def cached_prediction(text: str, model: LoadedModel) -> dict[str, str] | None:
+    return (await cached_predictions([text], model)).get(text)
+
+
+async def store_predictions(
+    model: LoadedModel, predictions: dict[str, dict[str, str]]
+) -> None:
+    for text, response in predictions.items():
+        metrics.PREDICTIONS.labels(stage=response["stage"]).inc()
+        prediction_cache.put(text, model.cache_key, response)
+    if disk_prediction_cache.enabled:
+        await asyncio.to_thread(save_disk_labels, model.cache_key, predictions)
+
+
+async def compute_prediction(text: str) -> dict[str, str]:
+    # The cascade answers confident texts without queueing for the model
+    model = ml_service.current
+    disease = None
+    if model.cascade is not None:
+        (disease,) = await inference_executor.run(model.predict_first_stage, [text])
+    stage = STAGE_TFIDF
+    if disease is None:
+        # A swap may happen while queued; the batch reports the model it used
+        disease, model = await batcher.submit(text)
+        stage = STAGE_MODEL
+
+    response = build_response(disease, stage, model.cache_key)
+    await store_predictions(model, {text: response})
+    return response
+
+
+async def compute_predictions(texts: list[str]) -> list[dict[str, str]]:
+    """Predict normalized texts in order, reusing cached and duplicate texts"""
+    # All texts are served by one model version even during a swap
+    model = ml_service.current
+    unique = list(dict.fromkeys(texts))
+    predictions = await cached_predictions(unique, model)
+    missing = [text for text in unique if text not in predictions]
+
+    if missing:
+        diseases = await inference_executor.run(
+            model.predict_batch_with_stages,
+            missing,
+            config.PREDICT_CHUNK_SIZE,
+        )
+
+        computed = {
+            text: build_response(disease, stage, model.cache_key)
+            for text, (disease, stage) in zip(missing, diseases, strict=True)
+        }
+        await store_predictions(model, computed)
+        predictions.update(computed)
+
+    return [predictions[text] for text in texts]
+
+
+def ensure_model_ready() -> None:
+    if not ml_service.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is loading, retry later",
+            headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)},
+        )
+
+
+def queue_full_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Inference queue is full, retry later",
+        headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)},
+    )
 
 
 @router.post(
@@ -29,46 +182,245 @@ class PredictionResponse(BaseModel):
         200: {"description": "Successful prediction"},
         404: {"description": "Diagnosis or recommendations not found"},
         500: {"description": "Internal server error"},
+        503: {"description": "Model is loading or inference queue is full"},
     },
 )
-async def predict_disease(
-    text: str, session: Session = Depends(get_session)
-) -> dict[str, str]:
+async def predict_disease(text: str) -> dict[str, str]:
     """
     Предсказывает диагноз на основе введенного текста.
 
     Возвращается:
     - диагноз: название диагноза
     - рекомендации: рекомендации по лечению (может быть пустым)
+    - stage: ступень каскада, давшая ответ (tfidf или roberta)
+    - model_version: версия модели, давшей ответ, с отпечатком настроек выполнения
     """
     try:
-        if not text.strip():
+        text = normalize_text(text)
+        if not text:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Input text cannot be empty",
             )
 
-        disease = ml_service.predict(text.lower().strip())
+        ensure_model_ready()
+        model = ml_service.current
+        cached = await cached_prediction(text, model)
+        if cached is not None:
+            return cached
 
-        recommendation = session.exec(
-            select(Recommendation).where(Recommendation.label == disease)
-        ).first()
+        # Identical requests arriving before the first result exists share it
+        return await predictions_in_flight.do(
+            (model.cache_key, text), lambda: compute_prediction(text)
+        )
 
-        response = {"diagnosis": disease}
+    except HTTPException:
+        raise
+    except QueueFullError:
+        raise queue_full_exception()
+    except Exception as e:
+        logger.error(f"Prediction failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error during prediction",
+        ) from e
 
-        if not recommendation or not recommendation.data.strip():
-            response["recommendations"] = ""
-            logger.warning(f"No recommendations found for disease: {disease}")
-        else:
-            response["recommendations"] = recommendation.data.strip()
 
-        return response
+@router.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    status_code=status.HTTP_200_OK,
+    operation_id="predict_batch",
+    summary="Пакетное определение диагнозов и рекомендаций",
+    tags=["Inference"],
+    responses={
+        200: {"description": "Successful prediction"},
+        400: {"description": "One of the input texts is empty"},
+        500: {"description": "Internal server error"},
+        503: {"description": "Model is loading or inference queue is full"},
+    },
+)
+async def predict_disease_batch(
+    payload: BatchPredictionRequest,
+) -> BatchPredictionResponse:
+    """
+    Предсказывает диагнозы для списка текстов.
+
+    Результаты возвращаются в том же порядке, что и входные тексты.
+    """
+    try:
+        texts = [normalize_text(text) for text in payload.texts]
+        if not all(texts):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Input texts cannot be empty",
+            )
+
+        ensure_model_ready()
+        predictions = await compute_predictions(texts)
+
+        results = [PredictionResponse(**prediction) for prediction in predictions]
+        return BatchPredictionResponse(results=results)
 
     except HTTPException:
         raise
+    except QueueFullError:
+        raise queue_full_exception()
     except Exception as e:
-        logger.error(f"Prediction failed: {str(e)}", exc_info=True)
+        logger.error(f"Batch prediction failed: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during prediction",
         ) from e
+
+
+StreamItem = dict[str, Any]
+
+
+async def predict_stream_batch(items: list[StreamItem]) -> list[StreamItem]:
+    """Fill in predictions for the valid items of one stream batch"""
+    valid = [item for item in items if "error" not in item]
+    texts = [item.pop("text") for item in valid]
+    while True:
+        try:
+            predictions = await compute_predictions(texts) if texts else []
+            break
+        except QueueFullError:
+            # A bulk stream waits for capacity instead of failing
+            await asyncio.sleep(config.RETRY_AFTER_SECONDS)
+    for item, prediction in zip(valid, predictions, strict=True):
+        item.update(prediction)
+    return items
+
+
+async def stream_predictions(request: Request) -> AsyncIterator[bytes]:
+    """Read, predict and write batches concurrently with bounded look-ahead"""
+    pending: asyncio.Queue[asyncio.Task[list[StreamItem]] | None] = asyncio.Queue(
+        maxsize=config.STREAM_MAX_PENDING_BATCHES
+    )
+
+    async def schedule(batch: list[StreamItem]) -> None:
+        await pending.put(asyncio.create_task(predict_stream_batch(batch)))
+
+    async def read_batches() -> None:
+        try:
+            batch: list[StreamItem] = []
+            number = 0
+            async for line in iter_lines(
+                request.stream(), config.STREAM_MAX_LINE_BYTES
+            ):
+                number += 1
+                item: StreamItem = {"line": number}
+                if isinstance(line, Exception):
+                    item["error"] = str(line)
+                elif not line.strip():
+                    continue
+                else:
+                    try:
+                        item_id, text = parse_item(line)
+                    except ValueError as e:
+                        item["error"] = str(e)
+                    else:
+                        if item_id is not None:
+                            item["id"] = item_id
+                        text = normalize_text(text)
+                        if text:
+                            item["text"] = text
+                        else:
+                            item["error"] = "Input text cannot be empty"
+                batch.append(item)
+                if len(batch) >= config.STREAM_BATCH_SIZE:
+                    await schedule(batch)
+                    batch = []
+            if batch:
+                await schedule(batch)
+        finally:
+            await pending.put(None)
+
+    reader = asyncio.create_task(read_batches())
+    try:
+        while (task := await pending.get()) is not None:
+            for item in await task:
+                yield encode(item)
+        await reader
+    except Exception as e:
+        logger.error(f"Stream prediction failed: {str(e)}", exc_info=True)
+        yield encode({"error": "Internal server error during prediction"})
+    finally:
+        reader.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+@router.post(
+    "/predict/stream",
+    status_code=status.HTTP_200_OK,
+    operation_id="predict_stream",
+    summary="Потоковое определение диагнозов в формате NDJSON",
+    tags=["Inference"],
+    responses={
+        200: {"description": "NDJSON stream of predictions"},
+        503: {"description": "Model is loading"},
+    },
+)
+async def predict_disease_stream(request: Request) -> NDJSONStreamingResponse:
+    """
+    Принимает NDJSON: по одному объекту `{"id": ..., "text": ...}`
+    (или строке с текстом) на строку, и возвращает NDJSON с результатами
+    в том же порядке по мере готовности пакетов.
+
+    Каждая строка ответа содержит номер входной строки `line`, `id`
+    (если был передан) и либо поля предсказания, либо `error`.
+    """
+    ensure_model_ready()
+    return NDJSONStreamingResponse(stream_predictions(request))
+
+
+@router.get(
+    "/queue",
+    operation_id="queue_stats",
+    summary="Состояние очереди инференса",
+    tags=["Inference"],
+)
+async def queue_stats() -> dict[str, dict[str, int | float]]:
+    """
+    Возвращает глубину очередей и время ожидания для автоскейлинга.
+    """
+    return {"batcher": batcher.stats(), "executor": inference_executor.stats()}
+
+
+@router.get(
+    "/cache",
+    operation_id="cache_stats",
+    summary="Статистика кэша предсказаний",
+    tags=["Inference"],
+)
+async def cache_stats() -> dict[str, bool | int | float | str | None]:
+    """
+    Возвращает размер кэша предсказаний, счётчики попаданий и промахов,
+    а также число объединённых одинаковых запросов.
+    """
+    return {
+        **prediction_cache.stats(),
+        **disk_prediction_cache.stats(),
+        **predictions_in_flight.stats(),
+    }
+
+
+@router.get(
+    "/cascade",
+    operation_id="cascade_stats",
+    summary="Статистика каскада моделей",
+    tags=["Inference"],
+)
+async def cascade_stats() -> dict[str, bool | int | float]:
+    """
+    Возвращает порог уверенности TF-IDF ступени и долю запросов,
+    на которые она ответила без обращения к RoBERTa.
+    """
+    cascade = ml_service.cascade if ml_service.ready else None
+    if cascade is None:
+        return {"enabled": False}
+    return {"enabled": True, **cascade.stats()}
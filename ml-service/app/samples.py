@@ -0,0 +1,43 @@
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Built-in complaints used when no held-out sample file is provided
+SAMPLE_TEXTS = [
+    "мужчина, 45 лет, давящая боль в груди при нагрузке, одышка",
+    "женщина, 30 лет, головная боль, тошнота, светобоязнь",
+    "мужчина, 62 лет, кашель с мокротой, температура 38, слабость",
+    "женщина, 25 лет, боль внизу живота справа, рвота",
+    "мужчина, 35 лет, изжога после еды, горечь во рту",
+    "женщина, 54 лет, повышенное давление, шум в ушах, головокружение",
+    "мужчина, 19 лет, боль в горле, температура, увеличены лимфоузлы",
+    "женщина, 41 лет, частое болезненное мочеиспускание, боль в пояснице",
+    "мужчина, 70 лет, отёки ног, одышка в положении лёжа",
+    "женщина, 33 лет, зудящая сыпь на руках после контакта с бытовой химией",
+    "мужчина, 28 лет, боль в колене после падения, отёк сустава",
+    "женщина, 66 лет, жажда, сухость во рту, частое мочеиспускание",
+    "мужчина, 50 лет, боль в пояснице, отдающая в ногу",
+    "женщина, 22 лет, заложенность носа, чихание, слезотечение весной",
+    "мужчина, 58 лет, слабость, бледность, одышка при ходьбе",
+    "женщина, 37 лет, тревога, бессонница, сердцебиение",
+    "сыпь",
+]
+
+
+def load_holdout_texts(path: Path | None) -> list[str]:
+    """Load one complaint per line, falling back to the built-in samples"""
+    if path is None:
+        logger.warning(
+            "PRECISION_SAMPLES_PATH is not set, using %d built-in samples",
+            len(SAMPLE_TEXTS),
+        )
+        return SAMPLE_TEXTS
+    if not path.exists():
+        logger.warning("Held-out sample file not found at %s", path)
+        return SAMPLE_TEXTS
+    with open(path, encoding="utf-8") as file:
+        texts = [line.strip() for line in file if line.strip()]
+    if not texts:
+        logger.warning("Held-out sample file %s is empty", path)
+    return texts or SAMPLE_TEXTS
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from app import config
+from app.services import metrics
+from app.services.executor import (
+    InferenceExecutor,
+    QueueFullError,
+    WaitTimes,
+    inference_executor,
+)
+from app.services.ml_service import ml_service
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+PendingItem = tuple[str, float, asyncio.Future[R]]
+
+
+class BatchScheduler(Generic[R]):
+    """Collects concurrent predictions into batches for a single forward pass
+
+    Up to `executor.max_workers` batches run at the same time; while all of
+    them are busy, new requests accumulate into the next batch. Requests
+    beyond `max_queue` are rejected with `QueueFullError`. Each request
+    resolves to the item `predict_batch` returned for its text.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[list[str]], list[R]],
+        executor: InferenceExecutor,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue: int,
+    ) -> None:
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.wait_times = WaitTimes(metrics.BATCHER_WAIT_SECONDS)
+        self._queue: asyncio.Queue[PendingItem[R]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the background batching loop on the running event loop"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = asyncio.Semaphore(self.executor.max_workers)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching loop and fail requests that are still waiting"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        assert self._queue is not None
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+        self._worker = None
+        self._queue = None
+        self._slots = None
+
+    async def submit(self, text: str) -> R:
+        """Enqueue a text and wait for its prediction"""
+        if self._queue is None:
+            raise RuntimeError("Batch scheduler is not running")
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, time.perf_counter(), future))
+        except asyncio.QueueFull:
+            raise QueueFullError("Inference queue is full")
+        return await future
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "queued": self.queued,
+            "capacity": self.max_queue,
+            "batches_running": len(self._batches),
+            **self.wait_times.summary(),
+        }
+
+    async def _collect(self) -> list[PendingItem[R]]:
+        """Wait for the first request, then gather more until full or timed out"""
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        assert self._slots is not None
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[PendingItem[R]]) -> None:
+        assert self._slots is not None
+        try:
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                return
+
+            started_at = time.perf_counter()
+            for _, submitted_at, _ in batch:
+                self.wait_times.record(started_at - submitted_at)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await self.executor.run(self.predict_batch, texts)
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {str(e)}", exc_info=True)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, _, future), result in zip(batch, results, strict=True):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+batcher = BatchScheduler(
+    ml_service.predict_tagged,
+    executor=inference_executor,
+    max_batch_size=config.BATCH_MAX_SIZE,
+    max_wait_ms=config.BATCH_MAX_WAIT_MS,
+    max_queue=config.INFERENCE_QUEUE_SIZE,
+)
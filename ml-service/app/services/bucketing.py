@@ -0,0 +1,38 @@
+from bisect import bisect_left
+
+
+def bucket_indices(
+    lengths: list[int], max_batch_size: int, boundaries: list[int]
+) -> list[list[int]]:
+    """Group item indices into batches of similar token length
+
+    Each item goes to the first bucket whose boundary is not smaller than
+    its length, and every bucket is split into batches of at most
+    `max_batch_size` items. Without boundaries items are chunked in their
+    original order.
+    """
+    max_batch_size = max(1, max_batch_size)
+    if not boundaries:
+        return [
+            list(range(start, min(start + max_batch_size, len(lengths))))
+            for start in range(0, len(lengths), max_batch_size)
+        ]
+
+    boundaries = sorted(boundaries)
+    buckets: dict[int, list[int]] = {}
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        buckets.setdefault(bisect_left(boundaries, lengths[index]), []).append(index)
+
+    batches = []
+    for bucket in buckets.values():
+        for start in range(0, len(bucket), max_batch_size):
+            batches.append(bucket[start : start + max_batch_size])
+    return batches
+
+
+def bucket_length(length: int, boundaries: list[int], max_length: int) -> int:
+    """Padded length of the bucket a sequence of `length` tokens falls into"""
+    for boundary in sorted(boundaries):
+        if length <= boundary:
+            return min(boundary, max_length)
+    return max_length
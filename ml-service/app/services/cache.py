@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app import config
+
+Prediction = dict[str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so near-identical complaints match"""
+    return " ".join(text.lower().split())
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions with a per-entry TTL
+
+    Entries are keyed by normalized text and model version. When a lookup
+    arrives with a new model version, all entries of the previous version
+    are dropped.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max(0, max_size)
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._version: str | None = None
+        self._entries: OrderedDict[str, tuple[float, Prediction]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, text: str, version: str) -> Prediction | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(text)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[text]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, text: str, version: str, prediction: Prediction) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[text] = (time.monotonic() + self.ttl, prediction)
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float | str | None]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "model_version": self._version,
+        }
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+
+prediction_cache = PredictionCache(
+    max_size=config.PREDICTION_CACHE_SIZE,
+    ttl_seconds=config.PREDICTION_CACHE_TTL_SECONDS,
+)
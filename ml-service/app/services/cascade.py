@@ -0,0 +1,46 @@
+import threading
+from pathlib import Path
+from typing import Any
+
+STAGE_TFIDF = "tfidf"
+STAGE_MODEL = "roberta"
+
+
+class Cascade:
+    """First cascade stage: a TF-IDF linear classifier with calibrated probabilities"""
+
+    def __init__(self, pipeline: Any, threshold: float) -> None:
+        self.pipeline = pipeline
+        self.threshold = threshold
+        self.answered = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, threshold: float) -> "Cascade":
+        import joblib
+
+        return cls(joblib.load(path), threshold)
+
+    def predict(self, texts: list[str]) -> list[str | None]:
+        """Labels for texts the classifier is confident about, None for the rest"""
+        probabilities = self.pipeline.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        labels = self.pipeline.classes_[best]
+
+        results = [
+            str(label) if probabilities[row, column] >= self.threshold else None
+            for row, (column, label) in enumerate(zip(best, labels, strict=True))
+        ]
+        with self._lock:
+            self.total += len(results)
+            self.answered += sum(label is not None for label in results)
+        return results
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "threshold": self.threshold,
+            "answered": self.answered,
+            "total": self.total,
+            "hit_rate": self.answered / self.total if self.total else 0.0,
+        }
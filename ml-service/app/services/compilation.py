@@ -0,0 +1,76 @@
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = ("eager", "trace", "compile")
+
+Runner = Callable[[Any, Any], Any]
+
+
+def logits_module(model: Any) -> Any:
+    """Wrap a sequence classifier so it takes plain tensors and returns logits"""
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model: Any) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids: Any, attention_mask: Any) -> Any:
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    return LogitsOnly(model).eval()
+
+
+def example_inputs(batch_size: int, length: int, token_id: int) -> tuple[Any, Any]:
+    import torch
+
+    input_ids = torch.full((batch_size, length), token_id, dtype=torch.long)
+    return input_ids, torch.ones_like(input_ids)
+
+
+def build_runner(model: Any, mode: str, token_id: int, length: int) -> Runner:
+    """Trace or compile the model; compilation errors propagate to the caller"""
+    import torch
+
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {mode}")
+
+    module: Runner = logits_module(model)
+    if mode == "trace":
+        with torch.no_grad():
+            traced = torch.jit.trace(  # type: ignore[no-untyped-call]
+                module, example_inputs(2, length, token_id)
+            )
+        frozen: Runner = torch.jit.freeze(traced)
+        return frozen
+    if mode == "compile":
+        compiled: Runner = torch.compile(module)
+        return compiled
+    return module
+
+
+def warm_up(runner: Runner, lengths: list[int], token_id: int) -> dict[int, float]:
+    """Run each padded length to trigger compilation and optimization, then time it
+
+    Returns the per-length latency in milliseconds of a second call.
+    """
+    import torch
+
+    latencies = {}
+    for length in lengths:
+        input_ids, attention_mask = example_inputs(2, length, token_id)
+        # The batch dimension varies at runtime; keep it out of the guards
+        torch._dynamo.mark_dynamic(input_ids, 0)
+        torch._dynamo.mark_dynamic(attention_mask, 0)
+        with torch.no_grad():
+            # TorchScript's profiling executor optimizes after the second run
+            for _ in range(2):
+                runner(input_ids, attention_mask)
+            started_at = time.perf_counter()
+            runner(input_ids, attention_mask)
+        latencies[length] = 1000 * (time.perf_counter() - started_at)
+    return latencies
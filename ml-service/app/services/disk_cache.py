@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# (diagnosis, stage); recommendations are looked up again on every hit so
+# that edits to the recommendation table are picked up
+CachedLabel = tuple[str, str]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    version TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    diagnosis TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (version, text_hash)
+)
+"""
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+
+class DiskPredictionCache:
+    """Prediction cache in a SQLite file shared by all workers on the host
+
+    The database runs in WAL mode, so readers in any process never wait for
+    a writer. Lookups read on the caller's thread, which must not be the
+    event loop since SQLite can still wait for a lock; writes are queued and
+    committed in batches by a background thread. Entries past `max_entries`
+    are evicted oldest first, using the rowid as insertion order, and
+    entries older than `ttl_seconds` are ignored.
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+        max_entries: int,
+        ttl_seconds: float,
+        flush_interval: float = 0.1,
+    ) -> None:
+        self.path = path
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._local = threading.local()
+        self._pending: list[tuple[str, bytes, str, str, float]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer: threading.Thread | None = None
+        self._writer_pid: int | None = None
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and self.max_entries > 0
+
+    def get(self, text: str, version: str) -> CachedLabel | None:
+        if not self.enabled:
+            return None
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT diagnosis, stage FROM predictions"
+                    " WHERE version = ? AND text_hash = ? AND created_at >= ?",
+                    (version, text_hash(text), time.time() - self.ttl),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            # A broken cache must not fail predictions
+            self.errors += 1
+            logger.warning(f"Disk cache lookup failed: {str(e)}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, text: str, version: str, diagnosis: str, stage: str) -> None:
+        if not self.enabled or self._closed:
+            return
+        entry = (version, text_hash(text), diagnosis, stage, time.time())
+        with self._lock:
+            self._pending.append(entry)
+        self._ensure_writer()
+
+    def close(self) -> None:
+        """Stop the writer thread after committing queued entries"""
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self._writer.join()
+        self._writer = None
+
+    def stats(self) -> dict[str, bool | int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "disk_enabled": self.enabled,
+            "disk_hits": self.hits,
+            "disk_misses": self.misses,
+            "disk_errors": self.errors,
+            "disk_hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection, reopened in forked worker processes"""
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            assert self.path is not None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL only syncs at checkpoints; a crash can
+            # lose the last commits, which is fine for a cache
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+        current: sqlite3.Connection = self._local.connection
+        return current
+
+    def _ensure_writer(self) -> None:
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer = threading.Thread(
+                target=self._write_loop, name="disk-cache-writer", daemon=True
+            )
+            self._writer_pid = os.getpid()
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            with self._lock:
+                entries, self._pending = self._pending, []
+            if entries:
+                try:
+                    self._write(entries)
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.warning(f"Disk cache write failed: {str(e)}")
+            if self._closed:
+                return
+
+    def _write(self, entries: list[tuple[str, bytes, str, str, float]]) -> None:
+        connection = self._connection()
+        with connection:
+            # REPLACE gives the entry a new rowid, so it is evicted last
+            connection.executemany(
+                "INSERT OR REPLACE INTO predictions"
+                " (version, text_hash, diagnosis, stage, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                entries,
+            )
+            connection.execute(
+                "DELETE FROM predictions"
+                " WHERE id <= (SELECT max(id) FROM predictions) - ?",
+                (self.max_entries,),
+            )
+
+
+disk_prediction_cache = DiskPredictionCache(
+    path=config.PREDICTION_DISK_CACHE_PATH,
+    max_entries=config.PREDICTION_DISK_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.PREDICTION_DISK_CACHE_TTL_SECONDS,
+)
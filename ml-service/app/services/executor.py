@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from prometheus_client import Histogram
+
+from app import config
+from app.services import metrics
+
+T = TypeVar("T")
+
+
+class QueueFullError(Exception):
+    """Raised when the inference wait queue has no free slots"""
+
+
+class WaitTimes:
+    """Sliding window of queue wait times, also exported as a histogram"""
+
+    def __init__(self, histogram: Histogram | None = None, window: int = 256) -> None:
+        self.histogram = histogram
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+        if self.histogram is not None:
+            self.histogram.observe(seconds)
+
+    def summary(self) -> dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"wait_ms_avg": 0.0, "wait_ms_p95": 0.0, "wait_ms_max": 0.0}
+        return {
+            "wait_ms_avg": 1000 * sum(samples) / len(samples),
+            "wait_ms_p95": 1000 * samples[int(0.95 * (len(samples) - 1))],
+            "wait_ms_max": 1000 * samples[-1],
+        }
+
+
+class InferenceExecutor:
+    """Runs blocking inference on a dedicated thread pool with a bounded wait queue"""
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.wait_times = WaitTimes(metrics.EXECUTOR_WAIT_SECONDS)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run `func` on the pool, failing fast when the wait queue is full"""
+        with self._lock:
+            if self._running + self._queued >= self.max_workers + self.max_queue:
+                raise QueueFullError("Inference queue is full")
+            self._queued += 1
+
+        submitted_at = time.perf_counter()
+
+        def task() -> T:
+            self.wait_times.record(time.perf_counter() - submitted_at)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "workers": self.max_workers,
+            "running": self._running,
+            "queued": self._queued,
+            "capacity": self.max_queue,
+            **self.wait_times.summary(),
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor(
+    max_workers=config.INFERENCE_WORKERS, max_queue=config.INFERENCE_QUEUE_SIZE
+)
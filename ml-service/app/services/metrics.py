@@ -0,0 +1,96 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Children are bound once here so recording a value is a lock and an addition
+STAGE_SECONDS = Histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in each inference stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+TOKENIZE_SECONDS = STAGE_SECONDS.labels(stage="tokenize")
+FORWARD_SECONDS = STAGE_SECONDS.labels(stage="forward")
+DECODE_SECONDS = STAGE_SECONDS.labels(stage="decode")
+CASCADE_SECONDS = STAGE_SECONDS.labels(stage="cascade")
+RECOMMENDATION_SECONDS = STAGE_SECONDS.labels(stage="recommendation")
+
+REQUEST_SECONDS = Histogram(
+    "ml_request_duration_seconds",
+    "End-to-end handler latency",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "ml_queue_wait_seconds",
+    "Time between submitting a text and its batch starting",
+    ["queue"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCHER_WAIT_SECONDS = QUEUE_WAIT_SECONDS.labels(queue="batcher")
+EXECUTOR_WAIT_SECONDS = QUEUE_WAIT_SECONDS.labels(queue="executor")
+
+BATCH_SIZE = Histogram(
+    "ml_forward_batch_size",
+    "Texts per forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+TOKEN_LENGTH = Histogram(
+    "ml_token_length",
+    "Tokens per text after truncation",
+    buckets=(8, 16, 32, 64, 128, 256, 512),
+)
+
+IN_FLIGHT = Gauge(
+    "ml_requests_in_flight",
+    "Requests currently being handled",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+FORWARD_IN_FLIGHT = Gauge(
+    "ml_forward_passes_in_flight",
+    "Forward passes currently running",
+    multiprocess_mode="livesum",
+)
+PREDICTIONS = Counter(
+    "ml_predictions_total",
+    "Predictions by the stage that produced them",
+    ["stage"],
+)
+
+
+def render() -> tuple[bytes, str]:
+    """Serialize metrics, aggregating all gunicorn workers in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,42 +1,495 @@
+import hashlib
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-import joblib
-import torch
-from transformers import AutoTokenizer, RobertaForSequenceClassification
+from app import config
+from app.samples import SAMPLE_TEXTS, load_holdout_texts
+from app.services import compilation, metrics, precision
+from app.services.bucketing import bucket_indices, bucket_length
+from app.services.cascade import STAGE_MODEL, STAGE_TFIDF, Cascade
+from app.services.registry import model_registry
+from app.services.truncation import parse_policy
 
+logger = logging.getLogger(__name__)
 
-class MLService:
-    _instance: Optional["MLService"] = None
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
+def resolve_backend(model_dir: Path) -> str:
+    """Pick the inference backend configured by INFERENCE_BACKEND"""
+    backend = config.INFERENCE_BACKEND
+    if backend == "auto":
+        onnx_available = (model_dir / config.ONNX_MODEL_FILE).exists()
+        return "onnx" if onnx_available else "torch"
+    if backend not in ("torch", "onnx"):
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return backend
+
+
+def artifact_version(model_dir: Path) -> str:
+    """Fingerprint the model artifacts by file name, size and modification time"""
+    digest = hashlib.sha256()
+    for path in sorted(model_dir.iterdir()):
+        if path.is_file():
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def runtime_fingerprint(
+    backend: str, precision: str, truncation: str, cascade_threshold: float | None
+) -> str:
+    """Fingerprint the runtime settings that can change predicted labels"""
+    cascade = "off" if cascade_threshold is None else repr(cascade_threshold)
+    settings = f"{backend};{precision};{truncation};{cascade}"
+    return hashlib.sha256(settings.encode()).hexdigest()[:8]
+
+
+class SwapInProgressError(Exception):
+    """Raised when a model swap is requested while another one is loading"""
 
-    def _initialize(self):
+
+class LoadedModel:
+    """One model version with everything needed to serve it
+
+    Creating the instance is cheap; torch, transformers and the checkpoint
+    are only imported and read by `load()`.
+    """
+
+    def __init__(self, model_dir: Path, name: str | None = None) -> None:
+        self.model_dir = model_dir
+        self.name = name or model_dir.name
+
+    def load(self, num_threads: int) -> None:
+        """Load model components and run a warm-up inference"""
+        self._initialize(num_threads)
+        self.warmup()
+
+    def warmup(self) -> None:
+        """Run one inference so the first real request does not pay for it"""
+        self.predict_batch(SAMPLE_TEXTS[:1])
+
+    def _initialize(self, num_threads: int) -> None:
         """Initialize model components"""
-        base_dir = Path(__file__).parent.parent
-        model_dir = base_dir / "data" / "bert"
+        import joblib
+        from transformers import AutoTokenizer
+
+        model_dir = self.model_dir
 
+        self.backend = resolve_backend(model_dir)
+        self.model_version = f"{self.name}-{artifact_version(model_dir)}"
+        self.truncation = parse_policy(config.TRUNCATION_POLICY)
         self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
-        self.model = RobertaForSequenceClassification.from_pretrained(model_dir)
-        self.model.eval()
         self.label_encoder = joblib.load(model_dir / "label_encoder_new.pkl")
+        self.cascade = self._load_cascade(model_dir)
+
+        if self.backend == "onnx":
+            self._load_onnx(model_dir, num_threads)
+        else:
+            self._load_torch(model_dir, num_threads)
+        # Predictions cached under one configuration must not be served
+        # after a restart with another one
+        fingerprint = runtime_fingerprint(
+            self.backend,
+            self.precision,
+            self.truncation.name,
+            self.cascade.threshold if self.cascade is not None else None,
+        )
+        self.cache_key = f"{self.model_version}:{fingerprint}"
+        logger.info(
+            "Loaded model %s from %s with %s backend",
+            self.model_version,
+            model_dir,
+            self.backend,
+        )
+
+    def _load_cascade(self, model_dir: Path) -> Cascade | None:
+        if not config.CASCADE_ENABLED:
+            return None
+        path = model_dir / config.CASCADE_MODEL_FILE
+        if not path.exists():
+            logger.warning("Cascade is enabled but %s is missing", path)
+            return None
+        logger.info("Loaded cascade model from %s", path)
+        return Cascade.load(path, config.CASCADE_THRESHOLD)
+
+    def _load_torch(self, model_dir: Path, num_threads: int) -> None:
+        import torch
+        from transformers import RobertaForSequenceClassification
+
+        torch.set_num_threads(num_threads)
+        # Safetensors checkpoints are memory-mapped instead of read eagerly
+        self.model = RobertaForSequenceClassification.from_pretrained(
+            model_dir,
+            low_cpu_mem_usage=True,
+            use_safetensors=(model_dir / "model.safetensors").exists() or None,
+        )
+        self.model.eval()  # type: ignore[no-untyped-call]
+
+        self.runner: compilation.Runner | None = None
+        self.execution_mode = "eager"
+        self.precision = "fp32"
+        self.precision_agreement = 1.0
+        if config.MODEL_PRECISION != "fp32":
+            self._apply_precision(config.MODEL_PRECISION)
+        if config.TORCH_EXECUTION_MODE != "eager":
+            self._compile(config.TORCH_EXECUTION_MODE)
+
+    def _compile(self, mode: str) -> None:
+        """Trace or compile the model and warm up every padded length bucket
+
+        Falls back to eager execution if compilation fails or the compiled
+        model disagrees with eager on the sample texts.
+        """
+        texts = SAMPLE_TEXTS
+        reference = self._predict_classes(texts, config.PREDICT_CHUNK_SIZE)
+        max_length = self.truncation.max_length
+        lengths = sorted(
+            {
+                bucket_length(boundary, config.LENGTH_BUCKETS, max_length)
+                for boundary in [*config.LENGTH_BUCKETS, max_length]
+            }
+        )
+        token_id = self.tokenizer.unk_token_id or 0
+
+        started_at = time.perf_counter()
+        try:
+            runner = compilation.build_runner(self.model, mode, token_id, lengths[0])
+            self.runner = runner
+            latencies = compilation.warm_up(runner, lengths, token_id)
+            predicted = self._predict_classes(texts, config.PREDICT_CHUNK_SIZE)
+            if predicted != reference:
+                raise RuntimeError("compiled model predictions differ from eager")
+        except Exception as e:
+            logger.warning("Execution mode %s failed, using eager: %s", mode, str(e))
+            self.runner = None
+            return
+
+        self.execution_mode = mode
+        logger.info(
+            "Execution mode %s ready in %.1fs, per-bucket latency: %s",
+            mode,
+            time.perf_counter() - started_at,
+            ", ".join(f"{length}={ms:.1f}ms" for length, ms in latencies.items()),
+        )
+
+    def _apply_precision(self, mode: str) -> None:
+        """Switch to reduced precision if it agrees with fp32 on held-out texts"""
+        candidate = precision.convert(self.model, mode)
+        if candidate is None:
+            logger.warning("Precision %s is unavailable, keeping fp32", mode)
+            return
+
+        texts = load_holdout_texts(config.PRECISION_SAMPLES_PATH)
+        if len(texts) < config.PRECISION_MIN_SAMPLES:
+            logger.warning(
+                "Precision %s rejected: %d held-out samples < %d, keeping fp32",
+                mode,
+                len(texts),
+                config.PRECISION_MIN_SAMPLES,
+            )
+            return
+
+        reference = self._predict_classes(texts, config.PREDICT_CHUNK_SIZE)
+        fp32_model, self.model = self.model, candidate
+        predicted = self._predict_classes(texts, config.PREDICT_CHUNK_SIZE)
+
+        agreement = precision.top1_agreement(reference, predicted)
+        if agreement < config.PRECISION_MIN_AGREEMENT:
+            logger.warning(
+                "Precision %s rejected: top-1 agreement %.3f < %.3f on %d samples",
+                mode,
+                agreement,
+                config.PRECISION_MIN_AGREEMENT,
+                len(texts),
+            )
+            self.model = fp32_model
+            return
+
+        self.precision = mode
+        self.precision_agreement = agreement
+        logger.info(
+            "Precision %s accepted: top-1 agreement %.3f on %d samples",
+            mode,
+            agreement,
+            len(texts),
+        )
+
+    def _load_onnx(self, model_dir: Path, num_threads: int) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if config.MODEL_PRECISION != "fp32":
+            logger.warning("MODEL_PRECISION only applies to the torch backend")
+        self.precision = "fp32"
+        self.precision_agreement = 1.0
+        self.session = ort.InferenceSession(
+            str(model_dir / config.ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.onnx_inputs = {node.name for node in self.session.get_inputs()}
 
     def predict(self, text: str) -> str:
         """Perform inference on input text"""
-        text = text.lower()
-        inputs = self.tokenizer(
-            text, return_tensors="pt", truncation=True, padding=True, max_length=512
+        return self.predict_batch([text])[0]
+
+    def predict_batch(
+        self, texts: list[str], chunk_size: int | None = None
+    ) -> list[str]:
+        """Perform inference on several texts in padded forward passes
+
+        Texts are processed in chunks of at most `chunk_size` items and all
+        predicted classes are decoded with a single `inverse_transform` call.
+        """
+        if not texts:
+            return []
+        predicted_classes = self._predict_classes(texts, chunk_size)
+        with metrics.DECODE_SECONDS.time():
+            labels: list[str] = self.label_encoder.inverse_transform(
+                predicted_classes
+            ).tolist()
+        return labels
+
+    def predict_first_stage(self, texts: list[str]) -> list[str | None]:
+        """Cascade labels for confidently classified texts, None for the rest"""
+        if self.cascade is None:
+            return [None] * len(texts)
+        with metrics.CASCADE_SECONDS.time():
+            return self.cascade.predict(texts)
+
+    def predict_batch_with_stages(
+        self, texts: list[str], chunk_size: int | None = None
+    ) -> list[tuple[str, str]]:
+        """Run the cascade, sending only low-confidence texts to the model
+
+        Returns a (label, stage) pair for every text.
+        """
+        labels = self.predict_first_stage(texts)
+        pending = [index for index, label in enumerate(labels) if label is None]
+        predicted = iter(
+            self.predict_batch([texts[index] for index in pending], chunk_size)
+        )
+        return [
+            (label, STAGE_TFIDF)
+            if label is not None
+            else (next(predicted), STAGE_MODEL)
+            for label in labels
+        ]
+
+    def _predict_classes(
+        self, texts: list[str], chunk_size: int | None = None
+    ) -> list[int]:
+        """Predict class ids, padding texts of similar length together"""
+        started_at = time.perf_counter()
+        encoded = self.encode(texts)
+        lengths = [len(input_ids) for input_ids in encoded]
+        for length in lengths:
+            metrics.TOKEN_LENGTH.observe(length)
+        tokenize_seconds = time.perf_counter() - started_at
+
+        predicted_classes = [0] * len(texts)
+        for indices in bucket_indices(
+            lengths, chunk_size or len(texts), config.LENGTH_BUCKETS
+        ):
+            features = {
+                "input_ids": [encoded[index] for index in indices],
+                "attention_mask": [[1] * lengths[index] for index in indices],
+            }
+            padding: dict[str, Any] = {}
+            if self.pad_to_bucket:
+                longest = max(lengths[index] for index in indices)
+                padding = {
+                    "padding": "max_length",
+                    "max_length": bucket_length(
+                        longest, config.LENGTH_BUCKETS, self.truncation.max_length
+                    ),
+                }
+            started_at = time.perf_counter()
+            inputs = self.tokenizer.pad(
+                features, return_tensors=self.tensor_type, **padding
+            )
+            tokenize_seconds += time.perf_counter() - started_at
+
+            metrics.BATCH_SIZE.observe(len(indices))
+            with metrics.FORWARD_IN_FLIGHT.track_inprogress():
+                with metrics.FORWARD_SECONDS.time():
+                    predicted = self._forward(inputs)
+            for index, predicted_class in zip(indices, predicted, strict=True):
+                predicted_classes[index] = predicted_class
+
+        metrics.TOKENIZE_SECONDS.observe(tokenize_seconds)
+        return predicted_classes
+
+    def encode(self, texts: list[str]) -> list[list[int]]:
+        """Tokenize texts and apply the truncation policy"""
+        encodings = self.tokenizer(
+            [text.lower() for text in texts], truncation=False, verbose=False
         )
+        return [self.truncation.truncate(ids) for ids in encodings["input_ids"]]
+
+    @property
+    def tensor_type(self) -> str:
+        return "np" if self.backend == "onnx" else "pt"
+
+    @property
+    def pad_to_bucket(self) -> bool:
+        """Compiled runners are specialized on the bucket lengths"""
+        return self.backend == "torch" and self.runner is not None
+
+    def _forward(self, inputs: Any) -> list[int]:
+        """Run one padded forward pass and return predicted class ids"""
+        if self.backend == "onnx":
+            return self._forward_onnx(inputs)
+        return self._forward_torch(inputs)
+
+    def _forward_torch(self, inputs: Any) -> list[int]:
+        import torch
 
         with torch.no_grad():
-            outputs = self.model(**inputs)
+            if self.runner is not None:
+                logits = self.runner(inputs["input_ids"], inputs["attention_mask"])
+            else:
+                logits = self.model(**inputs).logits
+
+        predicted: list[int] = torch.argmax(logits, dim=1).tolist()
+        return predicted
+
+    def _forward_onnx(self, inputs: Any) -> list[int]:
+        feed = {name: inputs[name] for name in self.onnx_inputs}
+        (logits,) = self.session.run(["logits"], feed)
+        predicted: list[int] = logits.argmax(axis=1).tolist()
+        return predicted
+
+
+class MLService:
+    """Lazily loaded singleton serving the active model version
+
+    Creating the instance is cheap; the model is only read by `load()`,
+    which can run in the background while the HTTP server is already
+    accepting connections. `swap()` loads another registry version next to
+    the serving one and replaces it atomically once its warm-up passed;
+    requests already running finish on the previous model.
+    """
+
+    _instance: Optional["MLService"] = None
+    _load_lock = threading.Lock()
+    _swap_lock = threading.Lock()
+
+    ready: bool
+    load_error: str | None
+    # Only set once `load()` succeeded, together with `ready`
+    current: LoadedModel
+    swap_status: dict[str, Any]
+
+    def __new__(cls) -> "MLService":
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.ready = False
+            cls._instance.load_error = None
+            cls._instance.swap_status = {"state": "idle"}
+        return cls._instance
+
+    def load(self, num_threads: int | None = None) -> None:
+        """Load the active registry version and run a warm-up inference
+
+        `num_threads` overrides TORCH_NUM_THREADS for the load itself.
+        """
+        with self._load_lock:
+            if self.ready:
+                return
+            try:
+                started_at = time.perf_counter()
+                name, model_dir = model_registry.resolve()
+                model = LoadedModel(model_dir, name)
+                model.load(num_threads or config.TORCH_NUM_THREADS)
+            except Exception as e:
+                self.load_error = str(e)
+                raise
+            self.current = model
+            self.ready = True
+            logger.info("Model ready in %.1fs", time.perf_counter() - started_at)
+
+    def swap(self, version: str) -> None:
+        """Load a registry version and switch to it once it is warmed up
+
+        Blocks until the swap succeeded or failed; on failure, including an
+        unknown version or a CURRENT file that cannot be written, the previous
+        model keeps serving. The registry CURRENT file is pointed at the new
+        version before it serves, so that other worker processes follow.
+        """
+        if not self._swap_lock.acquire(blocking=False):
+            raise SwapInProgressError(self.swap_status.get("target"))
+        try:
+            started_at = time.time()
+            self.swap_status = {
+                "state": "loading",
+                "target": version,
+                "started_at": started_at,
+            }
+            try:
+                candidate = LoadedModel(model_registry.path(version), version)
+                candidate.load(config.TORCH_NUM_THREADS)
+                model_registry.activate(version)
+            except Exception as e:
+                logger.error(f"Swap to model {version} failed: {str(e)}")
+                self.swap_status = {
+                    **self.swap_status,
+                    "state": "failed",
+                    "error": str(e),
+                    "finished_at": time.time(),
+                }
+                raise
+
+            previous = self.current.model_version if self.ready else None
+            self.current = candidate
+            self.swap_status = {
+                **self.swap_status,
+                "state": "succeeded",
+                "previous": previous,
+                "model_version": candidate.model_version,
+                "finished_at": time.time(),
+            }
+            logger.info(
+                "Swapped to model %s in %.1fs",
+                candidate.model_version,
+                time.time() - started_at,
+            )
+        finally:
+            self._swap_lock.release()
+
+    @property
+    def swapping(self) -> bool:
+        return self._swap_lock.locked()
+
+    @property
+    def model_version(self) -> str:
+        return self.current.model_version
+
+    @property
+    def backend(self) -> str:
+        return self.current.backend
+
+    @property
+    def cascade(self) -> Cascade | None:
+        return self.current.cascade
+
+    def predict(self, text: str) -> str:
+        """Perform inference on input text"""
+        return self.current.predict(text)
+
+    def predict_batch(
+        self, texts: list[str], chunk_size: int | None = None
+    ) -> list[str]:
+        return self.current.predict_batch(texts, chunk_size)
 
-        predicted_class = torch.argmax(outputs.logits, dim=1).item()
-        return self.label_encoder.inverse_transform([predicted_class])[0]
+    def predict_tagged(self, texts: list[str]) -> list[tuple[str, LoadedModel]]:
+        """Predict with the current model, pairing each label with that model"""
+        model = self.current
+        return [(label, model) for label in model.predict_batch(texts)]
 
 
 ml_service = MLService()
@@ -0,0 +1,79 @@
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class LineTooLongError(ValueError):
+    """Raised for an input line longer than the configured limit"""
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes | LineTooLongError]:
+    """Split a byte stream into lines, holding at most one line in memory
+
+    A line over `max_line_bytes` is discarded up to its newline and reported
+    as a `LineTooLongError` in its place.
+    """
+    buffer = bytearray()
+    discarding = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            if discarding:
+                discarding = False
+            else:
+                buffer += chunk[start:end]
+                yield _checked(buffer, max_line_bytes)
+            buffer.clear()
+            start = end + 1
+        if not discarding:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                yield LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+                buffer.clear()
+                discarding = True
+    if buffer and not discarding:
+        yield _checked(buffer, max_line_bytes)
+
+
+def _checked(buffer: bytearray, max_line_bytes: int) -> bytes | LineTooLongError:
+    if len(buffer) > max_line_bytes:
+        return LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+    return bytes(buffer)
+
+
+def parse_item(line: bytes) -> tuple[Any, str]:
+    """Parse `{"id": ..., "text": ...}` or a bare JSON string into (id, text)"""
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid JSON: {str(e)}") from e
+    if isinstance(item, str):
+        return None, item
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+        raise ValueError('Expected an object with a string "text" field')
+    return item.get("id"), item["text"]
+
+
+def encode(record: dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False).encode() + b"\n"
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streams NDJSON while the handler is still reading the request body
+
+    StreamingResponse normally listens for a client disconnect by reading
+    from `receive`, which would steal body chunks from `request.stream()`.
+    Here the body reader sees the disconnect instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,42 @@
+import copy
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def bf16_supported() -> bool:
+    import torch
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def convert(model: Any, precision: str) -> Any | None:
+    """Return a reduced-precision copy of the model, or None if unsupported"""
+    import torch
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown model precision: {precision}")
+    if precision == "int8":
+        return torch.ao.quantization.quantize_dynamic(  # type: ignore[no-untyped-call]
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if precision == "bf16":
+        if not bf16_supported():
+            logger.warning("bf16 is not supported by this CPU")
+            return None
+        return copy.deepcopy(model).to(torch.bfloat16)
+    return model
+
+
+def top1_agreement(reference: list[int], candidate: list[int]) -> float:
+    """Share of samples where both models predict the same class"""
+    if not reference:
+        return 1.0
+    matches = sum(a == b for a, b in zip(reference, candidate, strict=True))
+    return matches / len(reference)
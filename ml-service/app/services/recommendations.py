@@ -0,0 +1,33 @@
+import logging
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+
+from app.models import Recommendation
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationIndex:
+    """Read-only label → recommendation mapping loaded once from the database"""
+
+    def __init__(self) -> None:
+        self._data: Mapping[str, str] = MappingProxyType({})
+
+    def load(self, engine: Engine) -> None:
+        with Session(engine) as session:
+            rows = session.exec(select(Recommendation)).all()
+        self._data = MappingProxyType({row.label: row.data.strip() for row in rows})
+        logger.info("Loaded %d recommendations into memory", len(self._data))
+
+    def get(self, label: str) -> str:
+        """Return the recommendation text for a label, or an empty string"""
+        return self._data.get(label, "")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+recommendation_index = RecommendationIndex()
@@ -0,0 +1,68 @@
+import logging
+import os
+from pathlib import Path
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+
+
+class ModelRegistry:
+    """Versioned model directories under one root
+
+    Every subdirectory of the root is a version holding a full checkpoint.
+    The CURRENT file names the version to serve, so restarts and all worker
+    processes agree on it. Without any versions the registry falls back to
+    the single MODEL_DIR checkpoint.
+    """
+
+    def __init__(self, root: Path, fallback: Path) -> None:
+        self.root = root
+        self.fallback = fallback
+
+    def versions(self) -> list[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            path.name
+            for path in self.root.iterdir()
+            if path.is_dir() and not path.name.startswith(".")
+        )
+
+    def path(self, version: str) -> Path:
+        if version not in self.versions():
+            raise KeyError(version)
+        return self.root / version
+
+    def active(self) -> str | None:
+        """The version named in CURRENT, if it exists"""
+        try:
+            version = (self.root / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        if version not in self.versions():
+            logger.warning("CURRENT names unknown model version %r", version)
+            return None
+        return version
+
+    def resolve(self) -> tuple[str, Path]:
+        """Version to load at startup: CURRENT, else the newest, else MODEL_DIR"""
+        version = self.active()
+        if version is None:
+            versions = self.versions()
+            if not versions:
+                return self.fallback.name, self.fallback
+            version = versions[-1]
+        return version, self.root / version
+
+    def activate(self, version: str) -> None:
+        """Point CURRENT at a version, atomically for concurrent readers"""
+        self.path(version)
+        tmp_path = self.root / f".{CURRENT_FILE}.tmp"
+        tmp_path.write_text(f"{version}\n")
+        os.replace(tmp_path, self.root / CURRENT_FILE)
+
+
+model_registry = ModelRegistry(config.MODEL_REGISTRY_DIR, config.MODEL_DIR)
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+
+from app import config
+
+
+@dataclass(frozen=True)
+class TruncationPolicy:
+    """Keep at most `max_length` tokens: the start of the text plus `tail` last tokens
+
+    `head:N` keeps the first N tokens (the classic right truncation), while
+    `head_tail:N:T` keeps N tokens of which the last T come from the end of
+    the text, so that both the opening complaint and the latest history fit.
+    """
+
+    max_length: int
+    tail: int = 0
+
+    @property
+    def name(self) -> str:
+        if self.tail:
+            return f"head_tail:{self.max_length}:{self.tail}"
+        return f"head:{self.max_length}"
+
+    def truncate(self, input_ids: list[int]) -> list[int]:
+        """Truncate ids that start with <s> and end with </s>, keeping both"""
+        if len(input_ids) <= self.max_length:
+            return input_ids
+        bos, body, eos = input_ids[:1], input_ids[1:-1], input_ids[-1:]
+        budget = self.max_length - 2
+        tail = min(self.tail, budget)
+        head = body[: budget - tail]
+        return bos + head + (body[len(body) - tail :] if tail else []) + eos
+
+
+def parse_policy(spec: str) -> TruncationPolicy:
+    """Parse `head:N` or `head_tail:N:T`"""
+    kind, *params = spec.strip().split(":")
+    try:
+        values = [int(param) for param in params]
+    except ValueError:
+        raise ValueError(f"Invalid truncation policy: {spec}")
+
+    if kind == "head" and len(values) == 1:
+        policy = TruncationPolicy(max_length=values[0])
+    elif kind == "head_tail" and len(values) == 2:
+        policy = TruncationPolicy(max_length=values[0], tail=values[1])
+    else:
+        raise ValueError(f"Invalid truncation policy: {spec}")
+
+    if not 2 < policy.max_length <= config.MAX_SEQUENCE_LENGTH:
+        raise ValueError(
+            f"Truncation length must be between 3 and {config.MAX_SEQUENCE_LENGTH}"
+        )
+    if not 0 <= policy.tail <= policy.max_length - 2:
+        raise ValueError(f"Invalid tail length in truncation policy: {spec}")
+    return policy
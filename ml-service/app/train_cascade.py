@@ -0,0 +1,139 @@
+"""Train the TF-IDF first stage of the model cascade.
+
+Usage: python -m app.train_cascade --data PATH [--distill] [--model-dir PATH]
+
+`--data` is a CSV file with `text` and `label` columns, where labels are the
+diagnoses known to the RoBERTa label encoder. With `--distill` the file is
+read as one complaint per line and labeled by RoBERTa itself, so the first
+stage learns to reproduce the model it stands in front of.
+
+The classifier is written next to the checkpoint as `cascade.joblib`. A
+held-out split reports, for several confidence thresholds, the share of
+texts the first stage would answer and its accuracy on them, which is what
+CASCADE_THRESHOLD should be chosen from.
+"""
+
+import argparse
+import csv
+import logging
+from collections import Counter
+from pathlib import Path
+
+import joblib
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from app import config
+from app.services.cache import normalize_text
+from app.services.ml_service import LoadedModel
+from app.services.registry import model_registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98]
+
+
+def load_labeled(model: LoadedModel, path: Path) -> tuple[list[str], list[str]]:
+    with open(path, encoding="utf-8", newline="") as file:
+        rows = [
+            (normalize_text(row["text"]), row["label"].strip())
+            for row in csv.DictReader(file)
+        ]
+    rows = [(text, label) for text, label in rows if text and label]
+    known = set(model.label_encoder.classes_)
+    unknown = {label for _, label in rows if label not in known}
+    if unknown:
+        logger.warning("Skipping %d unknown labels: %s", len(unknown), unknown)
+    rows = [(text, label) for text, label in rows if label in known]
+    return [text for text, _ in rows], [label for _, label in rows]
+
+
+def load_distilled(model: LoadedModel, path: Path) -> tuple[list[str], list[str]]:
+    with open(path, encoding="utf-8") as file:
+        texts = list(dict.fromkeys(normalize_text(line) for line in file))
+    texts = [text for text in texts if text]
+    logger.info("Labeling %d texts with the model", len(texts))
+    return texts, model.predict_batch(texts, config.PREDICT_CHUNK_SIZE)
+
+
+def build_pipeline(labels: list[str]) -> Pipeline:
+    """Character n-grams cope with typos and Russian inflection"""
+    classifier = LogisticRegression(max_iter=1000, C=10.0)
+    folds = min(3, min(Counter(labels).values()))
+    if folds >= 2:
+        classifier = CalibratedClassifierCV(classifier, method="sigmoid", cv=folds)
+    else:
+        logger.warning("Too few samples per label to calibrate, using raw scores")
+    return Pipeline(
+        [
+            (
+                "tfidf",
+                TfidfVectorizer(
+                    analyzer="char_wb",
+                    ngram_range=(2, 5),
+                    sublinear_tf=True,
+                    min_df=2,
+                    max_features=200_000,
+                ),
+            ),
+            ("classifier", classifier),
+        ]
+    )
+
+
+def report(pipeline: Pipeline, texts: list[str], labels: list[str]) -> None:
+    """Log coverage and accuracy of the first stage per threshold"""
+    probabilities = pipeline.predict_proba(texts)
+    confidence = probabilities.max(axis=1)
+    predicted = pipeline.classes_[probabilities.argmax(axis=1)]
+    correct = predicted == labels
+
+    for threshold in THRESHOLDS:
+        answered = confidence >= threshold
+        coverage = answered.mean()
+        accuracy = correct[answered].mean() if answered.any() else 0.0
+        logger.info(
+            "threshold %.2f: answers %.1f%% of texts with %.1f%% accuracy",
+            threshold,
+            coverage * 100,
+            accuracy * 100,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", type=Path, required=True)
+    parser.add_argument("--distill", action="store_true")
+    parser.add_argument("--model-dir", type=Path, default=model_registry.resolve()[1])
+    parser.add_argument("--test-size", type=float, default=0.2)
+    args = parser.parse_args()
+
+    model = LoadedModel(args.model_dir)
+    model.load(config.TORCH_NUM_THREADS)
+    load = load_distilled if args.distill else load_labeled
+    texts, labels = load(model, args.data)
+    if len(set(labels)) < 2:
+        raise SystemExit("At least two distinct labels are needed for training")
+
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=args.test_size, random_state=0
+    )
+    logger.info(
+        "Training on %d texts, evaluating on %d", len(train_texts), len(test_texts)
+    )
+    pipeline = build_pipeline(train_labels).fit(train_texts, train_labels)
+    report(pipeline, test_texts, test_labels)
+
+    # The shipped classifier is refit on every labeled text
+    pipeline = build_pipeline(labels).fit(texts, labels)
+    output_path = args.model_dir / config.CASCADE_MODEL_FILE
+    joblib.dump(pipeline, output_path)
+    logger.info("Cascade model saved to %s", output_path)
+
+
+if __name__ == "__main__":
+    main()
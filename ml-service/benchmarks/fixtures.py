@@ -0,0 +1,160 @@
+"""Reproducible inputs for the benchmarks.
+
+Synthetic complaints are assembled from a fixed list of Russian symptom
+phrases with a seeded generator, so every run and every commit sees the same
+texts. `build_random_model` writes a checkpoint directory with the
+architecture of the real model and random weights, for machines (like CI)
+that do not have the trained checkpoint.
+"""
+
+import logging
+import random
+from pathlib import Path
+
+import joblib
+from sklearn.preprocessing import LabelEncoder
+from transformers import (
+    AutoConfig,
+    AutoTokenizer,
+    PreTrainedTokenizerBase,
+    PreTrainedTokenizerFast,
+    RobertaConfig,
+    RobertaForSequenceClassification,
+)
+
+logger = logging.getLogger(__name__)
+
+SYMPTOMS = [
+    "боль в груди",
+    "давящая боль за грудиной при нагрузке",
+    "одышка при ходьбе",
+    "головная боль",
+    "головокружение",
+    "тошнота",
+    "рвота после еды",
+    "температура 38",
+    "озноб",
+    "слабость",
+    "кашель с мокротой",
+    "сухой кашель по ночам",
+    "боль в горле",
+    "заложенность носа",
+    "сыпь на руках",
+    "зуд кожи",
+    "боль в пояснице, отдающая в ногу",
+    "отёки ног",
+    "частое мочеиспускание",
+    "жажда и сухость во рту",
+    "изжога",
+    "боль внизу живота справа",
+    "сердцебиение",
+    "бессонница",
+    "повышенное давление",
+    "шум в ушах",
+    "боль в колене после падения",
+    "светобоязнь",
+    "потеря аппетита",
+    "снижение веса за месяц",
+]
+
+DEFAULT_NUM_LABELS = 20
+
+
+def synthetic_texts(
+    count: int,
+    tokens: int,
+    tokenizer: PreTrainedTokenizerBase | None = None,
+    seed: int = 0,
+) -> list[str]:
+    """Complaints of roughly `tokens` tokens each, or words without a tokenizer"""
+    rng = random.Random(seed)
+
+    def length(phrase: str) -> int:
+        if tokenizer is None:
+            return len(phrase.split())
+        return len(tokenizer(phrase, add_special_tokens=False)["input_ids"])
+
+    phrase_lengths = {phrase: length(", " + phrase) for phrase in SYMPTOMS}
+    texts = []
+    for _ in range(count):
+        text = f"{rng.choice(['мужчина', 'женщина'])}, {rng.randint(18, 85)} лет"
+        total = length(text)
+        while total < tokens:
+            phrase = rng.choice(SYMPTOMS)
+            text += ", " + phrase
+            total += phrase_lengths[phrase]
+        texts.append(text)
+    return texts
+
+
+def train_tokenizer(seed: int = 0) -> PreTrainedTokenizerFast:
+    """Byte-level BPE tokenizer with RoBERTa special tokens"""
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel()
+    tokenizer.train_from_iterator(
+        synthetic_texts(2000, 64, seed=seed),
+        trainers.BpeTrainer(
+            vocab_size=2000,
+            special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"],
+        ),
+    )
+    tokenizer.post_processor = processors.RobertaProcessing(("</s>", 2), ("<s>", 0))
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<s>",
+        eos_token="</s>",
+        unk_token="<unk>",
+        pad_token="<pad>",
+        mask_token="<mask>",
+        cls_token="<s>",
+        sep_token="</s>",
+    )
+
+
+def build_random_model(
+    output_dir: Path,
+    model_dir: Path,
+    num_layers: int | None = None,
+    seed: int = 0,
+) -> None:
+    """Write a random-weight copy of the checkpoint in `model_dir` to `output_dir`
+
+    The architecture, tokenizer and labels are taken from `model_dir` where
+    present; otherwise roberta-base dimensions, a tokenizer trained on the
+    synthetic complaints and generic labels are used.
+    """
+    import torch
+
+    torch.manual_seed(seed)
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    except (OSError, ValueError):
+        logger.info("No tokenizer in %s, training one on synthetic texts", model_dir)
+        tokenizer = train_tokenizer(seed)
+
+    label_encoder_path = model_dir / "label_encoder_new.pkl"
+    if label_encoder_path.exists():
+        label_encoder = joblib.load(label_encoder_path)
+    else:
+        labels = [f"label_{index}" for index in range(DEFAULT_NUM_LABELS)]
+        label_encoder = LabelEncoder().fit(labels)
+
+    if (model_dir / "config.json").exists():
+        model_config = AutoConfig.from_pretrained(model_dir)
+    else:
+        logger.info("No config in %s, using roberta-base dimensions", model_dir)
+        model_config = RobertaConfig(
+            vocab_size=len(tokenizer),
+            max_position_embeddings=514,
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    model_config.num_labels = len(label_encoder.classes_)
+    if num_layers is not None:
+        model_config.num_hidden_layers = num_layers
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+    RobertaForSequenceClassification(model_config).save_pretrained(output_dir)
+    joblib.dump(label_encoder, output_dir / "label_encoder_new.pkl")
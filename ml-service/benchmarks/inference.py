@@ -0,0 +1,219 @@
+"""Measure MLService throughput and latency over batch sizes and thread counts.
+
+Usage:
+    python -m benchmarks.inference --batch-sizes 1 8 32 --threads 1 4 \
+        --lengths 32 128 --output report.json
+    python -m benchmarks.inference --random-weights --layers 2 \
+        --baseline main.json --max-regression 0.1
+
+Every combination of thread count, text length (in tokens) and batch size
+runs the same seeded synthetic complaints through `LoadedModel.predict_batch`,
+so tokenization, padding, the forward pass and decoding are all included.
+With `--random-weights` the checkpoint is replaced by random weights of the
+same architecture, which is enough for timing and needs no trained model.
+Every configuration runs in a fresh process that loads the model itself, so
+its peak RSS is its own and not the largest of the configurations before it.
+
+With `--baseline` the throughput of every matching configuration is compared
+with an earlier report, and the command exits with status 1 if any of them
+regressed by more than `--max-regression`.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from app import config
+from app.services.ml_service import LoadedModel
+from app.services.registry import model_registry
+from benchmarks.fixtures import build_random_model, synthetic_texts
+from benchmarks.truncation import percentile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Result = dict[str, Any]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_config(
+    model: LoadedModel, texts: list[str], batch_size: int, repeats: int
+) -> Result:
+    model.predict_batch(texts[:batch_size], batch_size)  # warm-up
+
+    latencies: list[float] = []
+    started_at = time.perf_counter()
+    for _ in range(repeats):
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            batch_started_at = time.perf_counter()
+            model.predict_batch(batch, batch_size)
+            latencies.append(1000 * (time.perf_counter() - batch_started_at))
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "throughput": round(repeats * len(texts) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(
+    model_dir: Path,
+    threads: int,
+    tokens: int,
+    batch_size: int,
+    args: argparse.Namespace,
+) -> tuple[Result, Result]:
+    """Load the model and time one configuration; runs in its own process"""
+    model = LoadedModel(model_dir)
+    model.load(threads)
+    texts = synthetic_texts(args.texts, tokens, model.tokenizer, args.seed)
+    result = {
+        "threads": threads,
+        "tokens": tokens,
+        "batch_size": batch_size,
+        **run_config(model, texts, batch_size, args.repeats),
+    }
+    environment = {
+        "model": "random" if args.random_weights else model.model_version,
+        "backend": model.backend,
+        "precision": model.precision,
+        "execution_mode": getattr(model, "execution_mode", "eager"),
+        "truncation": model.truncation.name,
+    }
+    return result, environment
+
+
+def measure_in_subprocess(
+    model_dir: Path,
+    threads: int,
+    tokens: int,
+    batch_size: int,
+    args: argparse.Namespace,
+) -> tuple[Result, Result]:
+    # A spawned process starts without the parent's memory or torch threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(
+            measure, model_dir, threads, tokens, batch_size, args
+        ).result()
+
+
+def compare(results: list[Result], baseline: list[Result], tolerance: float) -> bool:
+    """Log throughput against the baseline; False if anything regressed"""
+
+    def key(result: Result) -> tuple[int, int, int]:
+        return result["threads"], result["tokens"], result["batch_size"]
+
+    previous = {key(result): result for result in baseline}
+    passed = True
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        ratio = result["throughput"] / before["throughput"]
+        regressed = ratio < 1 - tolerance
+        passed = passed and not regressed
+        log = logger.error if regressed else logger.info
+        log(
+            "threads=%d tokens=%d batch=%d: %.1f -> %.1f texts/s (%+.1f%%)",
+            *key(result),
+            before["throughput"],
+            result["throughput"],
+            100 * (ratio - 1),
+        )
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", type=Path, default=model_registry.resolve()[1])
+    parser.add_argument("--random-weights", action="store_true")
+    parser.add_argument("--layers", type=int, help="layers of the random model")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument(
+        "--threads", nargs="+", type=int, default=[1, os.cpu_count() or 1]
+    )
+    parser.add_argument("--lengths", nargs="+", type=int, default=[32, 128])
+    parser.add_argument("--texts", type=int, default=64, help="texts per length")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dir = args.model_dir
+        if args.random_weights:
+            model_dir = Path(tmp_dir)
+            build_random_model(model_dir, args.model_dir, args.layers, args.seed)
+
+        results: list[Result] = []
+        environment: Result = {}
+        for threads in dict.fromkeys(args.threads):
+            for tokens in args.lengths:
+                for batch_size in args.batch_sizes:
+                    result, environment = measure_in_subprocess(
+                        model_dir, threads, tokens, batch_size, args
+                    )
+                    logger.info("%s", result)
+                    results.append(result)
+
+    report = {
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            **environment,
+            "length_buckets": list(config.LENGTH_BUCKETS),
+            "texts": args.texts,
+            "repeats": args.repeats,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    result = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(result, encoding="utf-8")
+    print(result)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if not compare(results, baseline["results"], args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare sequence-length policies on a corpus of complaints.
+
+Usage:
+    python -m benchmarks.truncation --corpus complaints.txt \
+        --policies head:128 head:256 head_tail:256:64
+
+Every policy runs over the whole corpus. The report contains p50/p95 batch
+latency, the number of tokens processed and top-1 agreement with the
+head:512 baseline.
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from app import config
+from app.samples import load_holdout_texts
+from app.services.ml_service import ml_service
+from app.services.precision import top1_agreement
+from app.services.truncation import TruncationPolicy, parse_policy
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+def run_policy(
+    texts: list[str], policy: TruncationPolicy, batch_size: int
+) -> tuple[list[str], dict[str, float | int | str]]:
+    model = ml_service.current
+    model.truncation = policy
+    model.predict_batch(texts[:batch_size])  # warm-up
+
+    labels: list[str] = []
+    latencies: list[float] = []
+    tokens = 0
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start : start + batch_size]
+        tokens += sum(len(input_ids) for input_ids in model.encode(batch))
+        started_at = time.perf_counter()
+        labels.extend(model.predict_batch(batch))
+        latencies.append(1000 * (time.perf_counter() - started_at))
+
+    return labels, {
+        "policy": policy.name,
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "tokens": tokens,
+        "texts": len(texts),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="one complaint per line")
+    parser.add_argument(
+        "--policies", nargs="+", default=["head:128", "head:256", "head_tail:256:64"]
+    )
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    args = parser.parse_args()
+
+    texts = load_holdout_texts(args.corpus)
+    baseline = parse_policy(f"head:{config.MAX_SEQUENCE_LENGTH}")
+    policies = [parse_policy(spec) for spec in args.policies]
+
+    ml_service.load()
+    logger.info("Running %d texts through %d policies", len(texts), len(policies))
+
+    reference, baseline_report = run_policy(texts, baseline, args.batch_size)
+    reports = [{**baseline_report, "agreement": 1.0}]
+    for policy in policies:
+        labels, report = run_policy(texts, policy, args.batch_size)
+        reports.append(
+            {**report, "agreement": round(top1_agreement(reference, labels), 4)}
+        )
+
+    result = json.dumps({"batch_size": args.batch_size, "policies": reports}, indent=2)
+    if args.output:
+        args.output.write_text(result, encoding="utf-8")
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
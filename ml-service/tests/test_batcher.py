@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from collections.abc import Callable
+
+import pytest
+
+from app.services.batcher import BatchScheduler
+from app.services.executor import InferenceExecutor, QueueFullError
+
+
+def make_batcher(
+    predict_batch: Callable[[list[str]], list[str]],
+    max_batch_size: int = 8,
+    max_queue: int = 16,
+) -> BatchScheduler[str]:
+    return BatchScheduler(
+        predict_batch,
+        executor=InferenceExecutor(max_workers=1, max_queue=max_queue),
+        max_batch_size=max_batch_size,
+        max_wait_ms=20,
+        max_queue=max_queue,
+    )
+
+
+def test_concurrent_requests_share_a_batch() -> None:
+    batches: list[list[str]] = []
+
+    def predict_batch(texts: list[str]) -> list[str]:
+        batches.append(texts)
+        return [text.upper() for text in texts]
+
+    async def main() -> list[str]:
+        batcher = make_batcher(predict_batch)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(t) for t in "abcde"))
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(main()) == ["A", "B", "C", "D", "E"]
+    assert batches == [["a", "b", "c", "d", "e"]]
+
+
+def test_batches_are_split_at_max_size() -> None:
+    batches: list[list[str]] = []
+
+    def predict_batch(texts: list[str]) -> list[str]:
+        batches.append(texts)
+        return texts
+
+    async def main() -> None:
+        batcher = make_batcher(predict_batch, max_batch_size=2)
+        await batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(t) for t in "abcde"))
+        finally:
+            await batcher.stop()
+
+    asyncio.run(main())
+    assert sorted(len(batch) for batch in batches) == [1, 2, 2]
+
+
+def test_batch_error_fails_every_request() -> None:
+    def predict_batch(_texts: list[str]) -> list[str]:
+        raise ValueError("boom")
+
+    async def main() -> list[BaseException | str]:
+        batcher = make_batcher(predict_batch)
+        await batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(t) for t in "ab"), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_full_queue_rejects_requests() -> None:
+    release = threading.Event()
+
+    def predict_batch(texts: list[str]) -> list[str]:
+        release.wait(5)
+        return texts
+
+    async def main() -> list[str]:
+        batcher = make_batcher(predict_batch, max_queue=1)
+        await batcher.start()
+        try:
+            # "a" occupies the only executor slot, "b" waits in the queue
+            running = asyncio.ensure_future(batcher.submit("a"))
+            await asyncio.sleep(0.1)
+            queued = asyncio.ensure_future(batcher.submit("b"))
+            await asyncio.sleep(0)
+            with pytest.raises(QueueFullError):
+                await batcher.submit("c")
+            release.set()
+            return [await running, await queued]
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+
+def test_submit_requires_a_running_scheduler() -> None:
+    batcher = make_batcher(lambda texts: texts)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit("a"))
@@ -0,0 +1,24 @@
+from app.services.bucketing import bucket_indices, bucket_length
+
+
+def test_without_boundaries_keeps_input_order() -> None:
+    assert bucket_indices([5, 1, 9, 3, 7], 2, []) == [[0, 1], [2, 3], [4]]
+
+
+def test_groups_similar_lengths() -> None:
+    lengths = [100, 10, 300, 20, 120, 30]
+    batches = bucket_indices(lengths, 2, [64, 128, 256])
+    assert batches == [[1, 3], [5], [0, 4], [2]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+
+
+def test_non_positive_batch_size_is_clamped() -> None:
+    assert bucket_indices([1, 2], 0, [16]) == [[0], [1]]
+
+
+def test_bucket_length() -> None:
+    boundaries = [128, 32, 64]
+    assert bucket_length(10, boundaries, 512) == 32
+    assert bucket_length(64, boundaries, 512) == 64
+    assert bucket_length(100, boundaries, 100) == 100
+    assert bucket_length(400, boundaries, 512) == 512
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from app.services.cache import PredictionCache, normalize_text
+
+PREDICTION = {"disease": "ОРВИ"}
+
+
+def test_normalize_text() -> None:
+    assert normalize_text("  Кашель,\tТемпература\n 38 ") == "кашель, температура 38"
+
+
+def test_hit_and_miss() -> None:
+    predictions = PredictionCache(max_size=2, ttl_seconds=60)
+    assert predictions.get("кашель", "v1") is None
+    predictions.put("кашель", "v1", PREDICTION)
+    assert predictions.get("кашель", "v1") == PREDICTION
+    assert (predictions.hits, predictions.misses) == (1, 1)
+    assert predictions.stats()["hit_rate"] == 0.5
+
+
+def test_evicts_least_recently_used() -> None:
+    predictions = PredictionCache(max_size=2, ttl_seconds=60)
+    predictions.put("a", "v1", PREDICTION)
+    predictions.put("b", "v1", PREDICTION)
+    predictions.get("a", "v1")
+    predictions.put("c", "v1", PREDICTION)
+    assert predictions.get("b", "v1") is None
+    assert predictions.get("a", "v1") == PREDICTION
+    assert predictions.get("c", "v1") == PREDICTION
+
+
+def test_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    predictions = PredictionCache(max_size=2, ttl_seconds=10)
+    predictions.put("a", "v1", PREDICTION)
+    now += 9
+    assert predictions.get("a", "v1") == PREDICTION
+    now += 2
+    assert predictions.get("a", "v1") is None
+    assert predictions.stats()["size"] == 0
+
+
+def test_new_version_drops_entries() -> None:
+    predictions = PredictionCache(max_size=2, ttl_seconds=60)
+    predictions.put("a", "v1", PREDICTION)
+    assert predictions.get("a", "v2") is None
+    assert predictions.stats()["model_version"] == "v2"
+    assert predictions.get("a", "v1") is None
+
+
+def test_disabled_cache_stores_nothing() -> None:
+    predictions = PredictionCache(max_size=0, ttl_seconds=60)
+    predictions.put("a", "v1", PREDICTION)
+    assert predictions.get("a", "v1") is None
+    assert predictions.misses == 0
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from app.routes import inference
+from app.services.cache import PredictionCache
+from app.services.disk_cache import DiskPredictionCache
+from app.services.ml_service import LoadedModel, runtime_fingerprint
+
+
+@pytest.fixture
+def disk_cache(tmp_path: Path) -> DiskPredictionCache:
+    return DiskPredictionCache(
+        tmp_path / "cache" / "predictions.sqlite",
+        max_entries=3,
+        ttl_seconds=60,
+        flush_interval=0.01,
+    )
+
+
+def test_entries_are_written_in_background(disk_cache: DiskPredictionCache) -> None:
+    disk_cache.put("кашель", "v1", "ОРВИ", "roberta")
+    disk_cache.close()
+    assert disk_cache.get("кашель", "v1") == ("ОРВИ", "roberta")
+    assert disk_cache.get("кашель", "v2") is None
+    assert disk_cache.stats()["disk_hits"] == 1
+    assert disk_cache.stats()["disk_misses"] == 1
+
+
+def test_oldest_entries_are_evicted(disk_cache: DiskPredictionCache) -> None:
+    for text in ("a", "b", "c"):
+        disk_cache.put(text, "v1", text.upper(), "tfidf")
+    # Replacing an entry makes it the newest
+    disk_cache.put("a", "v1", "A", "tfidf")
+    disk_cache.put("d", "v1", "D", "tfidf")
+    disk_cache.close()
+    assert disk_cache.get("b", "v1") is None
+    assert [disk_cache.get(text, "v1") for text in "acd"] == [
+        ("A", "tfidf"),
+        ("C", "tfidf"),
+        ("D", "tfidf"),
+    ]
+
+
+def test_expired_entries_are_ignored(
+    disk_cache: DiskPredictionCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    disk_cache.put("a", "v1", "A", "tfidf")
+    disk_cache.close()
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert disk_cache.get("a", "v1") is None
+
+
+def test_disabled_without_path() -> None:
+    disk_cache = DiskPredictionCache(None, max_entries=10, ttl_seconds=60)
+    disk_cache.put("a", "v1", "A", "tfidf")
+    assert disk_cache.get("a", "v1") is None
+    assert not disk_cache.stats()["disk_enabled"]
+
+
+def test_runtime_fingerprint_covers_label_settings() -> None:
+    base = ("torch", "fp32", "head:512", 0.9)
+    variants = [
+        ("onnx", "fp32", "head:512", 0.9),
+        ("torch", "int8", "head:512", 0.9),
+        ("torch", "fp32", "head_tail:512:128", 0.9),
+        ("torch", "fp32", "head:512", 0.8),
+        ("torch", "fp32", "head:512", None),
+    ]
+    fingerprints = {runtime_fingerprint(*settings) for settings in [base, *variants]}
+    assert len(fingerprints) == len(variants) + 1
+    assert runtime_fingerprint(*base) == runtime_fingerprint(*base)
+
+
+def test_cached_predictions_are_keyed_by_runtime_settings(
+    disk_cache: DiskPredictionCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(inference, "disk_prediction_cache", disk_cache)
+    monkeypatch.setattr(inference, "prediction_cache", PredictionCache(10, 60))
+
+    def model(cache_key: str) -> LoadedModel:
+        loaded = LoadedModel(Path("v1"))
+        loaded.model_version = "v1-abc"
+        loaded.cache_key = cache_key
+        return loaded
+
+    fp32, int8 = model("v1-abc:fp32"), model("v1-abc:int8")
+    response = inference.build_response("ОРВИ", "roberta", fp32.cache_key)
+    asyncio.run(inference.store_predictions(fp32, {"кашель": response}))
+    disk_cache.close()
+
+    assert asyncio.run(inference.cached_prediction("кашель", int8)) is None
+    # The memory cache was switched to int8, so this hit comes from disk
+    assert asyncio.run(inference.cached_prediction("кашель", fp32)) == response
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.executor import InferenceExecutor, QueueFullError, WaitTimes
+
+
+def test_runs_function_on_pool() -> None:
+    executor = InferenceExecutor(max_workers=2, max_queue=0)
+    try:
+        name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+    finally:
+        executor.shutdown()
+    assert name.startswith("inference")
+
+
+def test_rejects_work_beyond_workers_and_queue() -> None:
+    release = threading.Event()
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+
+    async def main() -> None:
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.1)
+        assert (executor.running, executor.queued) == (1, 1)
+        with pytest.raises(QueueFullError):
+            await executor.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(running, queued)
+        assert (executor.running, executor.queued) == (0, 0)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+
+def test_counters_recover_after_errors() -> None:
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+    def fail() -> None:
+        raise ValueError("boom")
+
+    async def main() -> None:
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+        assert await executor.run(lambda: 1) == 1
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert (executor.running, executor.queued) == (0, 0)
+
+
+def test_wait_times_summary() -> None:
+    wait_times = WaitTimes()
+    assert wait_times.summary()["wait_ms_max"] == 0.0
+    for seconds in (0.001, 0.002, 0.010):
+        wait_times.record(seconds)
+    summary = wait_times.summary()
+    assert summary["wait_ms_max"] == pytest.approx(10.0)
+    assert summary["wait_ms_avg"] == pytest.approx(13 / 3)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import config
+from app.routes import inference
+from app.services.ml_service import ml_service
+from app.services.ndjson import LineTooLongError, encode, iter_lines, parse_item
+
+
+def split_lines(chunks: list[bytes], max_line_bytes: int) -> list[bytes | str]:
+    async def stream() -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    async def main() -> list[bytes | str]:
+        return [
+            "too long" if isinstance(line, LineTooLongError) else line
+            async for line in iter_lines(stream(), max_line_bytes)
+        ]
+
+    return asyncio.run(main())
+
+
+def test_lines_split_across_chunks() -> None:
+    # Chunk boundaries fall inside lines and inside multi-byte characters
+    data = '{"text": "кашель"}\n"сыпь"\n\nlast'.encode()
+    chunks = [data[:13], data[13:30], data[30:]]
+    assert split_lines(chunks, 64) == [
+        '{"text": "кашель"}'.encode(),
+        '"сыпь"'.encode(),
+        b"",
+        b"last",
+    ]
+
+
+def test_long_line_is_reported_and_skipped() -> None:
+    chunks = [b"short\n" + b"x" * 6, b"x" * 6, b"xx\nnext\n", b"y" * 9]
+    assert split_lines(chunks, 8) == [b"short", "too long", b"next", "too long"]
+
+
+def test_parse_item() -> None:
+    assert parse_item(b'{"id": 7, "text": "cough"}') == (7, "cough")
+    assert parse_item(b'"cough"') == (None, "cough")
+    for line in (b"{", b'{"text": 1}', b"[1]", b"\xff"):
+        with pytest.raises(ValueError):
+            parse_item(line)
+
+
+def test_encode_keeps_unicode() -> None:
+    assert encode({"diagnosis": "ОРВИ"}) == '{"diagnosis": "ОРВИ"}\n'.encode()
+
+
+def test_stream_endpoint_preserves_order_and_reports_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def compute_predictions(texts: list[str]) -> list[dict[str, str]]:
+        return [{"diagnosis": text.upper()} for text in texts]
+
+    monkeypatch.setattr(inference, "compute_predictions", compute_predictions)
+    monkeypatch.setattr(ml_service, "ready", True)
+    monkeypatch.setattr(config, "STREAM_BATCH_SIZE", 2)
+    app = FastAPI()
+    app.include_router(inference.router)
+
+    body = "\n".join(
+        ['{"id": 1, "text": "a"}', "", '"b"', "{", '{"id": 4, "text": "  "}', '"c"']
+    )
+    with TestClient(app) as client:
+        response = client.post("/api/v1/model/predict/stream", content=body)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["line"] for record in records] == [1, 3, 4, 5, 6]
+    assert records[0] == {"line": 1, "id": 1, "diagnosis": "A"}
+    assert records[1] == {"line": 3, "diagnosis": "B"}
+    assert records[2]["error"].startswith("Invalid JSON")
+    assert records[3] == {"line": 5, "id": 4, "error": "Input text cannot be empty"}
+    assert records[4] == {"line": 6, "diagnosis": "C"}
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+
+from app.samples import SAMPLE_TEXTS, load_holdout_texts
+from app.services.precision import top1_agreement
+
+
+def test_top1_agreement() -> None:
+    assert top1_agreement([], []) == 1.0
+    assert top1_agreement([1, 2, 3, 4], [1, 2, 0, 4]) == 0.75
+    with pytest.raises(ValueError):
+        top1_agreement([1, 2], [1])
+
+
+def test_holdout_texts_from_file(tmp_path: Path) -> None:
+    path = tmp_path / "holdout.txt"
+    path.write_text("кашель\n\n  головная боль  \n", encoding="utf-8")
+    assert load_holdout_texts(path) == ["кашель", "головная боль"]
+
+
+def test_holdout_texts_fall_back_with_warning(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    empty = tmp_path / "empty.txt"
+    empty.write_text("\n", encoding="utf-8")
+    for path in (None, tmp_path / "missing.txt", empty):
+        caplog.clear()
+        assert load_holdout_texts(path) == SAMPLE_TEXTS
+        assert caplog.records[0].levelname == "WARNING"
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from app import config
+from app.routes.admin import verify_admin_token
+from app.services import ml_service as ml_service_module
+from app.services.ml_service import LoadedModel, ml_service
+from app.services.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path: Path) -> ModelRegistry:
+    root = tmp_path / "models"
+    for version in ("2024-05-01", "2024-06-10", ".staging"):
+        (root / version).mkdir(parents=True)
+    (root / "README").write_text("not a version")
+    return ModelRegistry(root, tmp_path / "fallback")
+
+
+def test_versions_skip_files_and_hidden_dirs(registry: ModelRegistry) -> None:
+    assert registry.versions() == ["2024-05-01", "2024-06-10"]
+    with pytest.raises(KeyError):
+        registry.path(".staging")
+
+
+def test_resolve_prefers_current_then_newest(registry: ModelRegistry) -> None:
+    assert registry.resolve() == ("2024-06-10", registry.root / "2024-06-10")
+    registry.activate("2024-05-01")
+    assert registry.active() == "2024-05-01"
+    assert registry.resolve() == ("2024-05-01", registry.root / "2024-05-01")
+
+
+def test_current_naming_unknown_version_is_ignored(registry: ModelRegistry) -> None:
+    (registry.root / "CURRENT").write_text("2023-01-01\n")
+    assert registry.active() is None
+    assert registry.resolve()[0] == "2024-06-10"
+
+
+def test_empty_registry_falls_back(tmp_path: Path) -> None:
+    registry = ModelRegistry(tmp_path / "missing", tmp_path / "model")
+    assert registry.resolve() == ("model", tmp_path / "model")
+
+
+def test_activate_rejects_unknown_version(registry: ModelRegistry) -> None:
+    with pytest.raises(KeyError):
+        registry.activate("2023-01-01")
+    assert registry.active() is None
+
+
+@pytest.fixture
+def swappable(monkeypatch: pytest.MonkeyPatch, registry: ModelRegistry) -> None:
+    def load(self: LoadedModel, _num_threads: int) -> None:
+        if self.name == "2024-05-01":
+            raise RuntimeError("broken checkpoint")
+        self.model_version = f"{self.name}-test"
+
+    previous = LoadedModel(registry.root / "2024-05-01")
+    previous.model_version = "previous-test"
+    monkeypatch.setattr(ml_service_module, "model_registry", registry)
+    monkeypatch.setattr(LoadedModel, "load", load)
+    monkeypatch.setattr(ml_service, "current", previous, raising=False)
+    monkeypatch.setattr(ml_service, "ready", True)
+    monkeypatch.setattr(ml_service, "swap_status", {"state": "idle"})
+
+
+@pytest.mark.usefixtures("swappable")
+def test_swap_replaces_model_and_updates_current(registry: ModelRegistry) -> None:
+    ml_service.swap("2024-06-10")
+    assert ml_service.model_version == "2024-06-10-test"
+    assert registry.active() == "2024-06-10"
+    assert ml_service.swap_status["state"] == "succeeded"
+    assert ml_service.swap_status["previous"] == "previous-test"
+
+
+@pytest.mark.usefixtures("swappable")
+def test_failed_swap_keeps_serving_model(registry: ModelRegistry) -> None:
+    with pytest.raises(RuntimeError):
+        ml_service.swap("2024-05-01")
+    assert ml_service.model_version == "previous-test"
+    assert registry.active() is None
+    assert ml_service.swap_status["state"] == "failed"
+    assert not ml_service.swapping
+
+
+@pytest.mark.usefixtures("swappable")
+def test_swap_to_unknown_version_is_recorded(registry: ModelRegistry) -> None:
+    with pytest.raises(KeyError):
+        ml_service.swap("2023-01-01")
+    assert ml_service.model_version == "previous-test"
+    assert registry.active() is None
+    assert ml_service.swap_status["state"] == "failed"
+    assert not ml_service.swapping
+
+
+@pytest.mark.usefixtures("swappable")
+def test_swap_keeps_serving_model_if_current_cannot_be_written(
+    monkeypatch: pytest.MonkeyPatch, registry: ModelRegistry
+) -> None:
+    def activate(version: str) -> None:
+        raise PermissionError(f"read-only registry: {version}")
+
+    monkeypatch.setattr(registry, "activate", activate)
+    with pytest.raises(PermissionError):
+        ml_service.swap("2024-06-10")
+    assert ml_service.model_version == "previous-test"
+    assert registry.active() is None
+    assert ml_service.swap_status["state"] == "failed"
+    assert ml_service.swap_status["error"] == "read-only registry: 2024-06-10"
+
+
+def test_admin_endpoints_require_configured_token(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config, "ADMIN_TOKEN", None)
+    with pytest.raises(HTTPException) as error:
+        verify_admin_token("anything")
+    assert error.value.status_code == 403
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    with pytest.raises(HTTPException):
+        verify_admin_token(None)
+    with pytest.raises(HTTPException):
+        verify_admin_token("wrong")
+    verify_admin_token("secret")
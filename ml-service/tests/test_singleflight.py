@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation() -> None:
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ОРВИ"
+
+    async def main() -> list[str]:
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["ОРВИ"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "coalesced": 4}
+
+
+def test_different_keys_run_separately() -> None:
+    flight = SingleFlight()
+
+    async def main() -> tuple[str, str]:
+        return await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+            flight.do("b", lambda: asyncio.sleep(0.01, "b")),
+        )
+
+    assert list(asyncio.run(main())) == ["a", "b"]
+    assert flight.coalesced == 0
+
+
+def test_errors_reach_every_caller() -> None:
+    flight = SingleFlight()
+
+    async def fail() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main() -> tuple[str | BaseException, str | BaseException]:
+        return await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.in_flight == 0
+
+
+def test_cancelled_caller_does_not_cancel_others() -> None:
+    flight = SingleFlight()
+
+    async def compute() -> str:
+        await asyncio.sleep(0.05)
+        return "ОРВИ"
+
+    async def main() -> str:
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "ОРВИ"
@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.truncation import TruncationPolicy, parse_policy
+
+# <s>=0, body 1..10, </s>=99
+IDS = [0, *range(1, 11), 99]
+
+
+def test_short_input_is_unchanged() -> None:
+    assert TruncationPolicy(max_length=16).truncate(IDS) == IDS
+
+
+def test_head_keeps_start() -> None:
+    assert TruncationPolicy(max_length=6).truncate(IDS) == [0, 1, 2, 3, 4, 99]
+
+
+def test_head_tail_keeps_start_and_end() -> None:
+    policy = TruncationPolicy(max_length=6, tail=2)
+    assert policy.truncate(IDS) == [0, 1, 2, 9, 10, 99]
+
+
+def test_tail_is_capped_by_budget() -> None:
+    policy = TruncationPolicy(max_length=4, tail=4)
+    assert policy.truncate(IDS) == [0, 9, 10, 99]
+
+
+def test_parse_policy() -> None:
+    assert parse_policy("head:128") == TruncationPolicy(max_length=128)
+    assert parse_policy(" head_tail:256:64 ").name == "head_tail:256:64"
+    assert parse_policy("head_tail:256:0").name == "head:256"
+
+
+@pytest.mark.parametrize(
+    "spec",
+    ["tail:128", "head", "head:abc", "head:2", "head:100000", "head_tail:64:63"],
+)
+def test_parse_policy_rejects_invalid_specs(spec: str) -> None:
+    with pytest.raises(ValueError):
+        parse_policy(spec)